@@ -0,0 +1,160 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Benchmarks of the scheduling hot paths, written to JSON.
+# Each benchmark is timed on each data file: the conflict check, penalty, feasibility check,
+# the PSO time vector update, one PSO iteration, one local search sweep,
+# and building the integer program and solving it (timed separately).
+# How to use  : python cli.py bench [DATA.csv ...] --json results.json [--compare old.json]
+# (or python benchmark.py). With --compare, benchmarks which got slower by more than
+# the threshold are listed and the command exits with status 1.
+
+import json, platform, subprocess, time, datetime
+import numpy as np
+import cvxpy as cvx
+
+import ucsp, main, coursedata, ilp_solution, milp
+
+# The small, spring, winter and full Engineering datasets
+DATASETS = ["data/Engineering_spring_2020_small.csv", "data/spring_csv_data.csv",
+            "data/winter_csv_data.csv", "data/Engineering_spring_2020.csv"]
+BENCHMARKS = ["check_conflict", "check_desirable", "check_feasible", "add_all_time_vectors",
+              "pso_iteration", "local_search_sweep", "ilp_build", "ilp_solve"]
+# Seconds per integer program solve: HiGHS solves the full Engineering data in about 2 s
+ILP_TIME_LIMIT = 30
+
+
+def measure(fn:callable, repeat:int=5, min_time:float=0.1)->dict:
+	'''Time fn(): call it enough times that each of the repeat measurements takes
+at least min_time seconds (timeit style). Returns seconds per call.'''
+	number = 1
+	while True:
+		start = time.perf_counter()
+		for k in range(number):
+			fn()
+		elapsed = time.perf_counter() - start
+		if elapsed >= min_time or number >= 1e6:
+			break
+		number *= 10 if elapsed < min_time/10 else 2
+	times = [elapsed/number]
+	for r in range(repeat - 1):
+		start = time.perf_counter()
+		for k in range(number):
+			fn()
+		times.append((time.perf_counter() - start)/number)
+	return {"min": min(times), "median": float(np.median(times)), "mean": float(np.mean(times)),
+	        "number": number, "repeat": repeat}
+
+
+def ilp_solver()->str:
+	'''The first installed integer programming backend (see milp.py), or None.'''
+	solvers = milp.available()
+	return solvers[0] if solvers else None
+
+
+def benchmark_dataset(infilename:str, names:[str]=BENCHMARKS, n_samples:int=10, seed:int=0,
+                      repeat:int=5, min_time:float=0.1, ilp_max_courses:int=None,
+                      ilp_time_limit:float=ILP_TIME_LIMIT)->[dict]:
+	'''Run the named benchmarks on one data file. The swarm benchmarks use n_samples schedules.
+The integer program is solved with a time limit of ilp_time_limit seconds, and
+only for data files with at most ilp_max_courses courses (default: all).'''
+	data = coursedata.load(infilename)
+	rng = np.random.default_rng(seed)
+	samples, in_points, n_discarded = main.init_samples(data, n_samples, rng)
+	for sample in samples:
+		sample.cache = None # time the penalty itself, not cache lookups
+	schedule = samples[0]
+	courses = schedule.schedule
+	pairs = rng.integers(0, len(data), (1000, 2))
+	moves = rng.integers(-1, 2, len(data))
+
+	def check_conflict():
+		for i, j in pairs:
+			courses[i].check_conflict(courses[j])
+
+	def add_all_time_vectors():
+		schedule.copy().add_all_time_vectors(moves)
+
+	def pso_iteration():
+		main.iteration_phase([sample.copy() for sample in samples], 1)
+
+	def local_search_sweep():
+		schedule.copy().local_search(max_sweeps=1)
+
+	def ilp_build():
+		return ilp_solution.IlpModel(data, np.random.default_rng(seed), verbose=False)
+
+	solver = ilp_solver()
+	ilp_model = ilp_build() if "ilp_solve" in names and solver is not None else None
+	def ilp_solve():
+		# The model is built once, outside the timer (that is ilp_build). cvxpy keeps the
+		# compiled problem, so only the first call also pays for compiling it.
+		milp.solve(ilp_model.problem, solver, ilp_time_limit)
+
+	functions = {"check_conflict": check_conflict, "check_desirable": schedule.check_desirable,
+	             "check_feasible": schedule.check_feasible, "add_all_time_vectors": add_all_time_vectors,
+	             "pso_iteration": pso_iteration, "local_search_sweep": local_search_sweep,
+	             "ilp_build": ilp_build, "ilp_solve": ilp_solve}
+	# Calls per timed function: check_conflict checks 1000 pairs
+	calls = {"check_conflict": len(pairs)}
+
+	results = []
+	for name in names:
+		if name == "ilp_solve" and (solver is None or (ilp_max_courses is not None and len(data) > ilp_max_courses)):
+			continue
+		seconds = measure(functions[name], repeat, min_time if not name.startswith("ilp") else 0)
+		for key in ["min", "median", "mean"]:
+			seconds[key] /= calls.get(name, 1)
+		results.append({"dataset": infilename, "courses": len(data), "benchmark": name,
+		                "seconds": seconds, "backend": ucsp.BACKEND,
+		                "solver": solver if name == "ilp_solve" else None})
+		print("{:40s} {:22s} {:10.3e} s".format(infilename, name, seconds["min"]))
+	return results
+
+
+def environment()->dict:
+	'''Where the benchmarks ran, so results from different machines aren't compared blindly.'''
+	try:
+		commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+	except OSError:
+		commit = None
+	return {"date": datetime.datetime.now().isoformat(), "commit": commit, "python": platform.python_version(),
+	        "numpy": np.__version__, "cvxpy": cvx.__version__, "machine": platform.machine(),
+	        "processor": platform.processor(), "backend": ucsp.BACKEND}
+
+
+def run(datasets:[str]=DATASETS, names:[str]=BENCHMARKS, outfilename:str=None, **options)->dict:
+	'''Benchmark every dataset and write the results to outfilename as JSON.'''
+	report = {"environment": environment(), "results": []}
+	for infilename in datasets:
+		report["results"] += benchmark_dataset(infilename, names, **options)
+	if outfilename is not None:
+		with open(outfilename, "w") as outfile:
+			json.dump(report, outfile, indent=1)
+	return report
+
+
+def result_key(result:dict)->tuple:
+	'''What a result measured: the same benchmark with another penalty backend or MILP solver
+is a different measurement, not a regression.'''
+	return (result["dataset"], result["benchmark"], result.get("backend"), result.get("solver"))
+
+
+def compare(report:dict, baseline:dict, threshold:float=1.2)->[str]:
+	'''List the benchmarks whose fastest time is more than threshold times the baseline's,
+comparing only results with the same dataset, benchmark, backend and solver.'''
+	old = {result_key(result): result["seconds"]["min"] for result in baseline["results"]}
+	regressions = []
+	for result in report["results"]:
+		key = result_key(result)
+		if key in old and result["seconds"]["min"] > threshold*old[key]:
+			regressions.append("{} on {} ({}{}): {:.3e} s, was {:.3e} s ({:.2f}x)".format(key[1], key[0],
+			                   key[2], "" if key[3] is None else ", " + key[3],
+			                   result["seconds"]["min"], old[key], result["seconds"]["min"]/old[key]))
+	return regressions
+
+
+if __name__ == "__main__":
+	import sys, cli
+	cli.main(["bench"] + sys.argv[1:])
@@ -0,0 +1,261 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Command line front end for the whole project.
+# How to use  : python cli.py COMMAND [options], with one of the commands
+#   solve-pso  DATA.csv              particle swarm + local search (main.py)
+#   solve-ilp  DATA.csv              integer linear program (ilp_solution.py)
+#   score      SCHEDULE.csv DATA.csv penalty terms of a schedule file (compute_penalty.py)
+#   ingest     INPUT.json|INPUT.csv  convert JSON to course data CSV, and build its cache (coursedata.py)
+#   heatmap    SCHEDULE.csv          plot a schedule file (data/course_heatmap.py)
+#   bench      [DATA.csv ...]        time the hot paths, write JSON, compare to old results (benchmark.py)
+# Run python cli.py COMMAND --help for the options of each command.
+#
+# Every option can also be set in a JSON config file given with --config.
+# Keys are option names (either "cache-capacity" or "cache_capacity"); a key named
+# after a command holds options for that command only, e.g.
+#   {"seed": 1, "solve-pso": {"samples": 100, "rounds": 20, "odd-hours-weight": 5}}
+# Options given on the command line win over the config file.
+
+import argparse, datetime, json, os, sys
+import numpy as np
+
+# The heatmap and JSON ingest scripts live in data/
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def solve_pso(args):
+	import main, coursedata
+	main.configure(args.backend, {"soft_overlap": args.soft_overlap_weight, "spreading": args.spreading_weight,
+	                              "odd_hours": args.odd_hours_weight, "lunch_hours": args.lunch_hours_weight},
+	               args.cache_capacity)
+	data = coursedata.load(args.data)
+	options = {"k_max": args.iterations, "c1": args.c1, "c2": args.c2, "population_file": args.population_file,
+	           "checkpoint_file": args.checkpoint, "resume": args.resume}
+
+	if args.decompose:
+		if args.plot is not None:
+			sys.exit("solve-pso: --plot doesn't work with --decompose, which has no penalties per sample to plot")
+		if args.runs > 1:
+			sys.exit("solve-pso: --runs doesn't work with --decompose, which runs one swarm per part")
+		import decompose
+		min_size = decompose.MIN_PART_SIZE if args.min_part_size is None else args.min_part_size
+		best = decompose.solve_pso(data, args.workers, min_size, args.seed,
+		                           n_samples=args.samples, n_rounds=args.rounds, **options)
+		print("Best schedule is feasible?", best.check_feasible())
+		print("Best final schedule: penalty = ", best.check_desirable())
+		for course in best.schedule:
+			print(course)
+		return
+
+	if args.runs > 1:
+		best_run, results = main.multi_start(data, args.runs, args.workers, args.samples, args.rounds, args.seed, **options)
+		for k, (best, in_points, out_points) in enumerate(results):
+			print("Run {}: best initial penalty = {}, best final penalty = {}".format(k, np.min(in_points), np.min(out_points)))
+		best, in_points, out_points = results[best_run]
+	else:
+		best, in_points, out_points = main.run_swarm(data, args.samples, args.rounds, args.seed, **options)
+
+	plot_file = None if args.no_plot else args.plot or "Plot_{}.png".format(datetime.datetime.now())
+	main.report(best, in_points, out_points, plot_file)
+
+
+def solve_ilp(args):
+	import ilp_solution, coursedata
+	for name in ["time", "overlap", "day_spread", "cluster"]:
+		value = getattr(args, name + "_weight")
+		if value is not None:
+			setattr(ilp_solution.IlpModel, name.upper() + "_WEIGHT", value)
+
+	data = coursedata.load(args.data)
+	if args.decompose:
+		if args.warm_start:
+			sys.exit("solve-ilp: --warm-start doesn't work with --decompose")
+		import decompose
+		min_size = decompose.MIN_PART_SIZE if args.min_part_size is None else args.min_part_size
+		model = decompose.solve_ilp(data, args.solver, args.workers, min_size, np.random.default_rng(args.seed),
+		                            time_limit=args.time_limit, gap=args.gap)
+	else:
+		model = ilp_solution.IlpModel(data, np.random.default_rng(args.seed), verbose=not args.quiet)
+		if args.warm_start:
+			import main
+			best, in_points, out_points = main.run_swarm(data, seed=args.seed)
+			value = model.warm_start(best, cutoff=not args.no_cutoff)
+			print("Warm start from the particle swarm: penalty", value)
+		result = model.solve(args.solver, args.time_limit, args.gap)
+		if result.value is None:
+			sys.exit("solve-ilp: no solution found ({})".format(result.status))
+
+	rows = model.schedule_rows()
+	if args.output is not None:
+		with open(args.output, "w") as outfile:
+			outfile.write("\n".join(rows) + "\n")
+	else:
+		# Print the header and data
+		for row in rows:
+			print(row)
+
+
+def score(args):
+	import compute_penalty
+	compute_penalty.score(args.schedule, args.data, args.verbose)
+
+
+def ingest(args):
+	import coursedata
+	infilename = args.input
+	if infilename.endswith(".json"):
+		if args.output is None:
+			sys.exit("ingest: give the output CSV file name with -o")
+		sys.path.append(DATA_DIR)
+		import datacruncher
+		with open(infilename, "r") as infile, open(args.output, "w") as outfile:
+			datacruncher.parseJsonData(infile, outfile)
+		infilename = args.output
+
+	data = coursedata.load(infilename)
+	print("{}: {} courses, {} hard and {} soft group entries, cached in {}".format(infilename, len(data),
+	      len(data.hard_idx), len(data.soft_idx), coursedata.cache_filename(infilename)))
+
+
+def heatmap(args):
+	sys.path.append(DATA_DIR)
+	import course_heatmap
+	course_heatmap.make_heatmap_from_file(args.schedule, names=args.names, save=args.save)
+
+
+def bench(args):
+	import main, benchmark
+	main.configure(args.backend)
+	report = benchmark.run(args.data or benchmark.DATASETS, args.benchmarks or benchmark.BENCHMARKS, args.json,
+	                       n_samples=args.samples, seed=args.seed, repeat=args.repeat, min_time=args.min_time,
+	                       ilp_max_courses=args.ilp_max_courses,
+	                       ilp_time_limit=benchmark.ILP_TIME_LIMIT if args.ilp_time_limit is None else args.ilp_time_limit)
+
+	if args.compare is not None:
+		with open(args.compare, "r") as infile:
+			regressions = benchmark.compare(report, json.load(infile), args.threshold)
+		for regression in regressions:
+			print("SLOWER:", regression)
+		if regressions:
+			sys.exit(1)
+
+
+def build_parser()->argparse.ArgumentParser:
+	import main
+
+	common = argparse.ArgumentParser(add_help=False)
+	common.add_argument("--config", help="JSON file of option values (see the top of cli.py)")
+
+	parser = argparse.ArgumentParser(description="University course scheduling: solvers and tools.")
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	pso = commands.add_parser("solve-pso", parents=[common], help="particle swarm optimization + local search")
+	pso.add_argument("data", help="course data CSV")
+	pso.add_argument("--samples", type=int, default=main.N_SAMPLES, help="particles per swarm")
+	pso.add_argument("--rounds", type=int, default=main.N_ROUNDS, help="rounds of PSO + local search")
+	pso.add_argument("--iterations", type=int, default=main.N_ITERATIONS, help="PSO iterations per round")
+	pso.add_argument("--c1", type=float, default=1, help="pull towards each particle's best")
+	pso.add_argument("--c2", type=float, default=1, help="pull towards the swarm's best")
+	pso.add_argument("--runs", type=int, default=main.N_RUNS, help="independent swarms, run in parallel")
+	pso.add_argument("--workers", type=int, help="processes for --runs or --decompose (default: one per CPU)")
+	pso.add_argument("--decompose", action="store_true", help="solve each connected component separately (decompose.py)")
+	pso.add_argument("--min-part-size", type=int,
+	                 help="with --decompose, pack components into parts this big (default: decompose.MIN_PART_SIZE)")
+	pso.add_argument("--seed", type=int, help="random seed, for reproducible runs")
+	pso.add_argument("--backend", choices=["auto", "numpy", "numba"], default="auto", help="penalty implementation")
+	pso.add_argument("--cache-capacity", type=int, default=main.CACHE_CAPACITY, help="penalties cached per swarm, 0 for none")
+	pso.add_argument("--population-file", default=main.POPULATION_FILE,
+	                 help="memory-map the swarm to this .npy file (and two next to it); one per run or part with --runs or --decompose")
+	pso.add_argument("--checkpoint", help="save the swarm to this file after every round; one per run or part with --runs or --decompose")
+	pso.add_argument("--resume", action="store_true", help="continue from the --checkpoint file")
+	pso.add_argument("--plot", help="plot file name (default: Plot_<date and time>.png)")
+	pso.add_argument("--no-plot", action="store_true", help="don't plot the penalties")
+	for name, attr in main.Ucsp.WEIGHT_NAMES.items():
+		pso.add_argument("--{}-weight".format(name.replace("_", "-")), type=float,
+		                 help="penalty weight (default: {})".format(getattr(main.Ucsp, attr)))
+	pso.set_defaults(run=solve_pso)
+
+	ilp = commands.add_parser("solve-ilp", parents=[common], help="integer linear program")
+	ilp.add_argument("data", help="course data CSV")
+	ilp.add_argument("--solver", help="GLPK_MI, CBC or HIGHS (default: the first installed, see milp.py)")
+	ilp.add_argument("--time-limit", type=float, help="stop after this many seconds (per part with --decompose) and keep the best solution found")
+	ilp.add_argument("--gap", type=float, help="stop once the solution is within this relative gap of the optimum")
+	ilp.add_argument("--seed", type=int, help="random seed for the cluster penalty targets")
+	ilp.add_argument("--output", help="write the schedule CSV here instead of printing it")
+	ilp.add_argument("--quiet", action="store_true", help="don't list the constraints as they are added")
+	ilp.add_argument("--warm-start", action="store_true", help="start from the best schedule of a particle swarm run")
+	ilp.add_argument("--no-cutoff", action="store_true", help="with --warm-start, don't bound the objective by the swarm's")
+	ilp.add_argument("--decompose", action="store_true", help="solve each connected component separately (decompose.py)")
+	ilp.add_argument("--min-part-size", type=int,
+	                 help="with --decompose, pack components into parts this big (default: decompose.MIN_PART_SIZE)")
+	ilp.add_argument("--workers", type=int, help="processes for --decompose (default: one per CPU)")
+	for name in ["time", "overlap", "day-spread", "cluster"]:
+		ilp.add_argument("--{}-weight".format(name), type=float, help="objective weight")
+	ilp.set_defaults(run=solve_ilp)
+
+	scorer = commands.add_parser("score", parents=[common], help="count the penalty terms of a schedule file")
+	scorer.add_argument("schedule", help="schedule CSV (startTime, endTime, dayCode columns)")
+	scorer.add_argument("data", help="course data CSV the schedule was made from")
+	scorer.add_argument("--verbose", action="store_true", help="list every overlap")
+	scorer.set_defaults(run=score)
+
+	ingester = commands.add_parser("ingest", parents=[common], help="convert JSON course data and build its cache")
+	ingester.add_argument("input", help="JSON schedule file or course data CSV")
+	ingester.add_argument("-o", "--output", help="CSV to write, for JSON input")
+	ingester.set_defaults(run=ingest)
+
+	plotter = commands.add_parser("heatmap", parents=[common], help="plot a schedule file as a heatmap")
+	plotter.add_argument("schedule", help="schedule CSV (startTime, endTime, dayCode columns)")
+	plotter.add_argument("--names", action="store_true", help="show course names (for small datasets)")
+	plotter.add_argument("--save", help="save to this file instead of showing the plot")
+	plotter.set_defaults(run=heatmap)
+
+	bencher = commands.add_parser("bench", parents=[common], help="benchmark the hot paths")
+	bencher.add_argument("data", nargs="*", help="course data CSVs (default: the small, spring, winter and Engineering data)")
+	bencher.add_argument("--benchmarks", nargs="+", help="which benchmarks to run (default: all)")
+	bencher.add_argument("--samples", type=int, default=10, help="swarm size for the PSO benchmarks")
+	bencher.add_argument("--repeat", type=int, default=5, help="timings per benchmark")
+	bencher.add_argument("--min-time", type=float, default=0.1, help="seconds per timing, at least")
+	bencher.add_argument("--seed", type=int, default=0)
+	bencher.add_argument("--backend", choices=["auto", "numpy", "numba"], default="auto")
+	bencher.add_argument("--ilp-max-courses", type=int, help="only solve the ILP for data this small (default: all)")
+	bencher.add_argument("--ilp-time-limit", type=float, help="seconds per ILP solve (default: benchmark.ILP_TIME_LIMIT)")
+	bencher.add_argument("--json", help="write the results to this JSON file")
+	bencher.add_argument("--compare", help="JSON results to compare against")
+	bencher.add_argument("--threshold", type=float, default=1.2, help="slowdown factor counted as a regression")
+	bencher.set_defaults(run=bench)
+
+	parser.command_parsers = commands.choices # for load_config
+	return parser
+
+
+def load_config(filename:str, command:str, parser:argparse.ArgumentParser)->dict:
+	'''Read the option values for command from a JSON config file.'''
+	with open(filename, "r") as infile:
+		config = json.load(infile)
+	commands = parser.command_parsers
+	values = {key: value for key, value in config.items() if key not in commands}
+	values.update(config.get(command, {}))
+	values = {key.replace("-", "_"): value for key, value in values.items()}
+
+	known = {action.dest for action in commands[command]._actions}
+	unknown = sorted(set(values) - known)
+	if unknown:
+		parser.error("{}: unknown options for {}: {}".format(filename, command, ", ".join(unknown)))
+	return values
+
+
+def main(argv:[str]=None):
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	if args.config is not None:
+		# Parse again with the config file values as defaults, so the command line wins
+		parser.command_parsers[args.command].set_defaults(**load_config(args.config, args.command, parser))
+		args = parser.parse_args(argv)
+	args.run(args)
+
+
+if __name__ == "__main__":
+	main()
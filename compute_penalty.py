@@ -6,56 +6,54 @@
 # and the accompanying data (that the schedule was generated from)
 # (to get the penalty groups)
 # and computes the penalty on the schedule for easy comparison.
+# How to use  : python cli.py score SCHEDULE.csv DATA.csv (or python compute_penalty.py SCHEDULE.csv DATA.csv)
 
 import csv
-import numpy as np
+import timegrid, coursedata
+from conflictgraph import ConflictGraph, HARD, SOFT
 
-def check_overlap(row1, row2)->True or False:
-	d1 = np.array([int(d) for d in row1['dayCode']])
-	d2 = np.array([int(d) for d in row2['dayCode']])
-	
-	# Remember the overlap happens if NONE of these hold.
-	return not any([
-		int(row1['startTime']) - int(row2['endTime']) >= 0,
-		int(row2['startTime']) - int(row1['endTime']) >= 0,
-		np.max(np.add(d1, d2)) <= 1,
-		])
+def row_occupancy(row)->int:
+	'''Half-hour occupancy bitmask of a schedule row (see timegrid.py).'''
+	return timegrid.occupancy(int(row['startTime']), int(row['endTime']), row['dayCode'])
 
 
-if __name__ == "__main__":
+def check_overlap(row1, row2)->True or False:
+	# The overlap happens if the two rows share a half-hour on the same day.
+	return timegrid.overlaps(row_occupancy(row1), row_occupancy(row2))
+
 
-	schedulefile = open(input("Optimal schedule file (csv): "), "r")
-	groupsfile   = open(input("Original data (csv): "), "r")
+def score(schedulefilename:str, datafilename:str, verbose:bool=False)->dict:
+	'''Count the penalty terms of a schedule file, given the data it was generated from.
+Prints the counts (and with verbose, every overlapping pair and the hard group violations).
+Returns them as a dict.'''
+	graph = ConflictGraph.from_data(coursedata.load(datafilename))
 
 	# Memory inefficient: Read the whole schedule into memory.
-	reader = csv.DictReader(schedulefile)
-	rows = [row for row in reader]
+	with open(schedulefilename, "r") as schedulefile:
+		reader = csv.DictReader(schedulefile)
+		rows = [row for row in reader]
 
 
-	# Check for hard overlap violations and soft overlaps
+	# Check for hard overlap violations and soft overlaps.
+	# Each pair is checked once (see conflictgraph.py), and counts as often as it is listed.
 	overlap_count   = 0
 	violation_count = 0
-	# We want to figure out the groups
-	for i,r in enumerate(csv.DictReader(groupsfile)):
-		# convert to 0-based indexing
-		hard_group = [int(g)-1 for g in r['cantOverlap'].split(";") if g != ""]
-		soft_group = [int(g)-1 for g in r['shouldntOverlap'].split(";") if g != ""]
-
-		for other_idx in hard_group:
-
-			# A course overlapping itself doesn't count
-			if i != other_idx and check_overlap(rows[i], rows[other_idx]):
-				#print("ERROR: ", rows[i], " conflicts with ", rows[other_idx])
-				violation_count += 1
-
-		# Check the soft overlap groups
-		for other_idx in soft_group:
-			if i != other_idx and check_overlap(rows[i], rows[int(other_idx)]):
-				#print("WARNING: ", rows[i], " conflicts with ", rows[other_idx])
-				overlap_count += 1
+	for i, j, weight in zip(*graph.edges(HARD)):
+		if check_overlap(rows[i], rows[j]):
+			if verbose:
+				print("ERROR: ", rows[i], " conflicts with ", rows[j])
+			violation_count += int(weight)
+
+	# Check the soft overlap groups
+	for i, j, weight in zip(*graph.edges(SOFT)):
+		if check_overlap(rows[i], rows[j]):
+			if verbose:
+				print("WARNING: ", rows[i], " conflicts with ", rows[j])
+			overlap_count += int(weight)
 
 	# doesn't really work
-	#print("Hard group violations:", violation_count)
+	if verbose:
+		print("Hard group violations:", violation_count)
 	print("Soft group overlaps  :", overlap_count)
 
 
@@ -76,8 +74,10 @@ if __name__ == "__main__":
 	print("Odd hours:", odd_hours_count)
 	print("Lunchtime:", lunch_count)
 
+	return {"hard_violations": violation_count, "soft_overlaps": overlap_count,
+	        "odd_hours": odd_hours_count, "lunchtime": lunch_count}
 
 
-	# Responsibly close our files
-	schedulefile.close()
-	groupsfile.close()
\ No newline at end of file
+if __name__ == "__main__":
+	import sys, cli
+	cli.main(["score"] + sys.argv[1:])
@@ -0,0 +1,118 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : The constraint graph of a course scheduling problem, shared by the solvers
+# (ucsp.py, ilp_solution.py) and compute_penalty.py.
+# The data lists each course's cantOverlap (hard) and shouldntOverlap (soft) courses per row,
+# so one pair can be listed several times, from either end. Here each pair is one edge (i < j)
+# per kind, weighted by how many times it is listed. A course listed in its own group is left out:
+# a course overlapping itself doesn't count.
+# How to use  : graph = ConflictGraph.from_data(coursedata.load("data/winter_csv_data.csv"))
+# src, dst, weight = graph.edges(HARD)
+# Run file to print the listed and distinct edges of each data file.
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# Edge kinds
+HARD = 0 # cantOverlap
+SOFT = 1 # shouldntOverlap
+KIND_NAMES = ["hard", "soft"]
+
+
+class ConflictGraph:
+	'''Canonical edges and a symmetric CSR adjacency over n courses.
+src, dst: (E,) edge ends, src[e] < dst[e], sorted by kind, then src, then dst.
+kind    : (E,) HARD or SOFT.
+weight  : (E,) how many times the pair is listed in the data (for that kind, either direction).
+ptr, nbr, nbr_edge: adjacency with one row per (kind, course): the kind k neighbours of course i
+are nbr[ptr[k*n + i]:ptr[k*n + i + 1]], and nbr_edge holds the matching edge numbers.
+Each edge appears once in the row of each of its ends.
+'''
+	def __init__(self, n:int, src:np.array, dst:np.array, kind:np.array, weight:np.array):
+		self.n, self.src, self.dst, self.kind, self.weight = n, src, dst, kind, weight
+
+		edge = np.arange(len(src))
+		rows = np.concatenate([kind*n + src, kind*n + dst])
+		others = np.concatenate([dst, src])
+		order = np.lexsort((others, rows))
+		self.ptr = np.zeros(len(KIND_NAMES)*n + 1, dtype=int)
+		self.ptr[1:] = np.cumsum(np.bincount(rows, minlength=len(KIND_NAMES)*n))
+		self.nbr = others[order]
+		self.nbr_edge = np.concatenate([edge, edge])[order]
+		self.nbr_weight = weight[self.nbr_edge]
+
+	@classmethod
+	def from_csr(cls, n:int, hard:(np.array, np.array), soft:(np.array, np.array))->"ConflictGraph":
+		'''Build the graph from per-course CSR lists (ptr, idx) of the hard and soft
+constraints, as in coursedata.CourseData: course i is listed with idx[ptr[i]:ptr[i+1]].'''
+		keys = []
+		for kind, (ptr, idx) in enumerate([hard, soft]):
+			src = np.repeat(np.arange(n), np.diff(ptr))
+			dst = np.asarray(idx, dtype=int)
+			keep = src != dst
+			lo, hi = np.minimum(src, dst)[keep], np.maximum(src, dst)[keep]
+			keys.append((kind*n + lo)*n + hi)
+		keys, weight = np.unique(np.concatenate(keys), return_counts=True)
+		return cls(n, (keys // n) % n, keys % n, keys // (n*n), weight)
+
+	@classmethod
+	def from_data(cls, data)->"ConflictGraph":
+		'''The graph of a coursedata.CourseData.'''
+		return cls.from_csr(len(data), (data.hard_ptr, data.hard_idx), (data.soft_ptr, data.soft_idx))
+
+	def __len__(self)->int:
+		return self.n
+
+	def edges(self, kind:int)->(np.array, np.array, np.array):
+		'''The (src, dst, weight) arrays of the edges of one kind.'''
+		start, stop = np.searchsorted(self.kind, [kind, kind + 1])
+		return self.src[start:stop], self.dst[start:stop], self.weight[start:stop]
+
+	def csr(self, kind:int)->(np.array, np.array, np.array):
+		'''The adjacency of one kind as (ptr, nbr, nbr_weight): the neighbours of course i
+are nbr[ptr[i]:ptr[i+1]], with edge weights nbr_weight[ptr[i]:ptr[i+1]].'''
+		return self.ptr[kind*self.n:(kind + 1)*self.n + 1], self.nbr, self.nbr_weight
+
+	def neighbours(self, i:int, kind:int)->np.array:
+		'''The courses sharing a kind edge with course i.'''
+		return self.nbr[self.ptr[kind*self.n + i]:self.ptr[kind*self.n + i + 1]]
+
+	def incident(self, i:int, kind:int)->np.array:
+		'''Numbers of the kind edges at course i, counted from the first edge of that kind
+(so they index the arrays returned by edges(kind)).'''
+		edges = self.nbr_edge[self.ptr[kind*self.n + i]:self.ptr[kind*self.n + i + 1]]
+		return edges - np.searchsorted(self.kind, kind)
+
+	def components(self)->(int, np.array):
+		'''Connected components over edges of both kinds: the number of components, and the
+component of each course. Components are numbered in order of their first course.'''
+		adjacency = sp.coo_matrix((np.ones(len(self.src)), (self.src, self.dst)), shape=(self.n, self.n))
+		return connected_components(adjacency, directed=False)
+
+	def degree(self, kind:int=None)->np.array:
+		'''Number of neighbours of each course, of one kind or (default) both.'''
+		degree = np.diff(self.ptr).reshape(len(KIND_NAMES), self.n)
+		return np.sum(degree, axis=0) if kind is None else degree[kind]
+
+
+# TEST CODE
+
+if __name__ == "__main__":
+	import sys, coursedata
+
+	for infilename in sys.argv[1:] or ["data/spring_csv_data.csv", "data/winter_csv_data.csv",
+	                                   "data/Engineering_spring_2020_small.csv", "data/Engineering_spring_2020.csv"]:
+		data = coursedata.load(infilename)
+		graph = ConflictGraph.from_data(data)
+		print(infilename)
+		for kind, name in enumerate(KIND_NAMES):
+			src, dst, weight = graph.edges(kind)
+			listed = len(getattr(data, name + "_idx"))
+			print("  {}: {} listed, {} edges, total weight {}".format(name, listed, len(src), np.sum(weight)))
+			# every edge is in both of its ends' rows
+			ptr, nbr, nbr_weight = graph.csr(kind)
+			assert all(j in graph.neighbours(i, kind) and i in graph.neighbours(j, kind) for i, j in zip(src, dst))
+			assert np.sum(nbr_weight[ptr[0]:ptr[-1]]) == 2*np.sum(weight) and np.all(src < dst)
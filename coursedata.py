@@ -0,0 +1,184 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Loader for the course data files (data/*_csv_data.csv and friends).
+# Parses the CSV once into columns: per-course arrays, and the cantOverlap and
+# shouldntOverlap groups as CSR index arrays (0-based, see ucsp.csr_indices).
+# The result is saved as a .npz file next to the CSV and reused by later runs,
+# until the CSV's modification time and contents change.
+# How to use  : data = coursedata.load("data/winter_csv_data.csv")
+# Run file to (re)build the cache for a data file and print a summary.
+
+import csv, hashlib, os, threading, zipfile
+import numpy as np
+
+# Bump this when the cached arrays change, so old caches are rebuilt
+CACHE_VERSION = 1
+
+
+class CourseData:
+	'''The static data of a course scheduling problem, one entry per course (CSV row).
+course_names  : courseNumber strings, e.g. "AA 222"
+enrolled      : numberEnrolled
+meeting_length: meetingLengthHours
+n_meetings    : numberOfMeetings (per week)
+hard_ptr, hard_idx: cantOverlap groups. Course i can't overlap hard_idx[hard_ptr[i]:hard_ptr[i+1]].
+soft_ptr, soft_idx: shouldntOverlap groups, the same way.
+The group indices are 0-based, unlike the 1-based ones in the CSV.
+'''
+	FIELDS = ["course_names", "enrolled", "meeting_length", "n_meetings",
+	          "hard_ptr", "hard_idx", "soft_ptr", "soft_idx"]
+
+	def __init__(self, **arrays):
+		for name in self.FIELDS:
+			setattr(self, name, arrays[name])
+
+	def __len__(self)->int:
+		return len(self.course_names)
+
+	def hard(self, i:int)->np.array:
+		'''0-based indices of the courses course i can't overlap.'''
+		return self.hard_idx[self.hard_ptr[i]:self.hard_ptr[i+1]]
+
+	def soft(self, i:int)->np.array:
+		'''0-based indices of the courses course i shouldn't overlap.'''
+		return self.soft_idx[self.soft_ptr[i]:self.soft_ptr[i+1]]
+
+	def subset(self, idx:np.array)->"CourseData":
+		'''The data of courses idx only, renumbered 0, 1, ... in that order.
+Group entries naming courses outside idx are dropped.'''
+		idx = np.asarray(idx, dtype=int)
+		position = np.full(len(self), -1)
+		position[idx] = np.arange(len(idx))
+		arrays = {name: getattr(self, name)[idx] for name in ["course_names", "enrolled", "meeting_length", "n_meetings"]}
+		for kind in ["hard", "soft"]:
+			ptr, entries = getattr(self, kind + "_ptr"), getattr(self, kind + "_idx")
+			groups = [position[entries[ptr[i]:ptr[i+1]]] for i in idx]
+			groups = [group[group >= 0] for group in groups]
+			arrays[kind + "_ptr"] = np.concatenate([[0], np.cumsum([len(group) for group in groups], dtype=int)])
+			arrays[kind + "_idx"] = np.concatenate(groups + [np.empty(0, dtype=int)])
+		return CourseData(**arrays)
+
+
+def parse_csv(infilename:str)->CourseData:
+	'''Parse a course data CSV, streaming it one row at a time.'''
+	names, enrolled, length, meetings = [], [], [], []
+	hard_ptr, hard_idx = [0], []
+	soft_ptr, soft_idx = [0], []
+
+	with open(infilename, "r") as infile:
+		for row in csv.DictReader(infile):
+			names.append(row['courseNumber'])
+			enrolled.append(int(row['numberEnrolled']))
+			length.append(float(row['meetingLengthHours']))
+			meetings.append(int(row['numberOfMeetings']))
+			# convert to 0-based indexing
+			hard_idx += [int(g)-1 for g in row['cantOverlap'].split(";") if g != '']
+			soft_idx += [int(g)-1 for g in row['shouldntOverlap'].split(";") if g != '']
+			hard_ptr.append(len(hard_idx))
+			soft_ptr.append(len(soft_idx))
+
+	return CourseData(course_names=np.array(names, dtype=str), enrolled=np.array(enrolled, dtype=int),
+	                  meeting_length=np.array(length, dtype=float), n_meetings=np.array(meetings, dtype=int),
+	                  hard_ptr=np.array(hard_ptr, dtype=int), hard_idx=np.array(hard_idx, dtype=int),
+	                  soft_ptr=np.array(soft_ptr, dtype=int), soft_idx=np.array(soft_idx, dtype=int))
+
+
+def cache_filename(infilename:str)->str:
+	'''The cache of data/x.csv is data/x.npz.'''
+	return os.path.splitext(infilename)[0] + ".npz"
+
+
+def file_hash(infilename:str)->str:
+	with open(infilename, "rb") as infile:
+		return hashlib.sha1(infile.read()).hexdigest()
+
+
+def load(infilename:str, use_cache:bool=True)->CourseData:
+	'''Load a course data CSV, from its cache if that is still valid.
+The cache is valid if it was written from a file with the same modification time,
+or failing that the same SHA-1 hash (e.g. the file was touched or checked out again).
+Otherwise the CSV is parsed and the cache rewritten. If the cache can't be written
+(e.g. read-only data directory), the parsed data is returned anyway.
+'''
+	if not use_cache:
+		return parse_csv(infilename)
+
+	cachename = cache_filename(infilename)
+	mtime = os.stat(infilename).st_mtime_ns
+	data, sha1 = read_cache(cachename, infilename, mtime)
+	if data is not None:
+		return data
+
+	data = parse_csv(infilename)
+	save_cache(data, cachename, mtime, file_hash(infilename) if sha1 is None else sha1)
+	return data
+
+
+def read_cache(cachename:str, infilename:str, mtime:int)->(CourseData, str):
+	'''The cached data, if the cache is valid for infilename (see load), and the file's SHA-1 hash
+if it had to be computed. A missing, unreadable or incomplete cache (e.g. truncated by a
+crash, or from an older version) is a miss: (None, sha1).'''
+	sha1 = None
+	if not os.path.exists(cachename):
+		return None, sha1
+	try:
+		with np.load(cachename) as cache:
+			if int(cache['version']) != CACHE_VERSION:
+				return None, sha1
+			if int(cache['mtime']) == mtime:
+				return CourseData(**{name: cache[name] for name in CourseData.FIELDS}), sha1
+			sha1 = file_hash(infilename)
+			if str(cache['sha1']) != sha1:
+				return None, sha1
+			data = CourseData(**{name: cache[name] for name in CourseData.FIELDS})
+	except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+		return None, sha1
+	save_cache(data, cachename, mtime, sha1) # so the next run only checks the mtime
+	return data, sha1
+
+
+def save_cache(data:CourseData, cachename:str, mtime:int, sha1:str):
+	'''Write the cache file. Written to a temporary file first, so a reader never sees half of it.
+The temporary file is named after this process and thread, so runs writing the same cache
+at once (e.g. a batch of jobs on one data file) don't write into each other's files.'''
+	tmpname = "{}.{}-{}.tmp.npz".format(cachename, os.getpid(), threading.get_ident())
+	try:
+		np.savez(tmpname, version=CACHE_VERSION, mtime=mtime, sha1=sha1,
+		         **{name: getattr(data, name) for name in CourseData.FIELDS})
+		os.replace(tmpname, cachename)
+	except OSError:
+		if os.path.exists(tmpname):
+			os.remove(tmpname)
+
+
+# TEST CODE
+
+if __name__ == "__main__":
+	import sys, time
+
+	for infilename in sys.argv[1:] or ["data/Engineering_spring_2020.csv"]:
+		start = time.perf_counter()
+		parsed = parse_csv(infilename)
+		parse_time = time.perf_counter() - start
+
+		load(infilename) # make sure the cache is up to date
+		start = time.perf_counter()
+		data = load(infilename)
+		load_time = time.perf_counter() - start
+
+		print("{}: {} courses, {} hard and {} soft group entries".format(infilename, len(data),
+		      len(data.hard_idx), len(data.soft_idx)))
+		print("Parse {:.2f} ms, load from {} {:.2f} ms".format(1e3*parse_time, cache_filename(infilename), 1e3*load_time))
+		print("Cache matches parse?", all(np.array_equal(getattr(data, name), getattr(parsed, name))
+		                                  for name in CourseData.FIELDS))
+
+		# A truncated cache (e.g. from a crash while copying it) is parsed again and rewritten
+		cachename = cache_filename(infilename)
+		with open(cachename, "r+b") as cache:
+			cache.truncate(os.path.getsize(cachename)//2)
+		data = load(infilename)
+		print("Truncated cache reparsed?", all(np.array_equal(getattr(data, name), getattr(parsed, name))
+		                                       for name in CourseData.FIELDS) and read_cache(cachename, infilename,
+		                                       os.stat(infilename).st_mtime_ns)[0] is not None)
@@ -7,52 +7,52 @@
 # (to get the penalty groups)
 # and computes the penalty on the schedule for easy comparison.
 
-import csv
-import numpy as np
+import argparse, csv, os, sys
+
+# timegrid.py and coursedata.py live in the top level of the project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import timegrid, coursedata
+from conflictgraph import ConflictGraph, HARD, SOFT
+
+def row_occupancy(row)->int:
+	'''Half-hour occupancy bitmask of a schedule row (see timegrid.py).'''
+	return timegrid.occupancy(int(row['startTime']), int(row['endTime']), row['dayCode'])
+
 
 def check_overlap(row1, row2)->True or False:
-	d1 = np.array([int(d) for d in row1['dayCode']])
-	d2 = np.array([int(d) for d in row2['dayCode']])
-	
-	# Remember the overlap happens if NONE of these hold.
-	return not any([
-		int(row1['startTime']) - int(row2['endTime']) >= 0,
-		int(row2['startTime']) - int(row1['endTime']) >= 0,
-		np.max(np.add(d1, d2)) <= 1,
-		])
+	# The overlap happens if the two rows share a half-hour on the same day.
+	return timegrid.overlaps(row_occupancy(row1), row_occupancy(row2))
 
 
 if __name__ == "__main__":
 
-	schedulefile = open(input("Optimal schedule file (csv): "), "r")
-	groupsfile   = open(input("Original data (csv): "), "r")
+	parser = argparse.ArgumentParser(description="Score a schedule file, listing every overlap")
+	parser.add_argument("schedule", help="Optimal schedule file (csv)")
+	parser.add_argument("data", help="Original data (csv)")
+	args = parser.parse_args()
+
+	schedulefile = open(args.schedule, "r")
+	graph        = ConflictGraph.from_data(coursedata.load(args.data))
 
 	# Memory inefficient: Read the whole schedule into memory.
 	reader = csv.DictReader(schedulefile)
 	rows = [row for row in reader]
 
 
-	# Check for hard overlap violations and soft overlaps
+	# Check for hard overlap violations and soft overlaps.
+	# Each pair is checked once (see conflictgraph.py), and counts as often as it is listed.
 	overlap_count   = 0
 	violation_count = 0
-	# We want to figure out the groups
-	for i,r in enumerate(csv.DictReader(groupsfile)):
-		# convert to 0-based indexing
-		hard_group = [int(g)-1 for g in r['cantOverlap'].split(";") if g != ""]
-		soft_group = [int(g)-1 for g in r['shouldntOverlap'].split(";") if g != ""]
-
-		for other_idx in hard_group:
-
-			# A course overlapping itself doesn't count
-			if i != other_idx and check_overlap(rows[i], rows[other_idx]):
-				print("ERROR: ", rows[i], " conflicts with ", rows[other_idx])
-				violation_count += 1
+	for i, j, weight in zip(*graph.edges(HARD)):
+		if check_overlap(rows[i], rows[j]):
+			print("ERROR: ", rows[i], " conflicts with ", rows[j])
+			violation_count += int(weight)
 
-		# Check the soft overlap groups
-		for other_idx in soft_group:
-			if i != other_idx and check_overlap(rows[i], rows[int(other_idx)]):
-				print("WARNING: ", rows[i], " conflicts with ", rows[other_idx])
-				overlap_count += 1
+	# Check the soft overlap groups
+	for i, j, weight in zip(*graph.edges(SOFT)):
+		if check_overlap(rows[i], rows[j]):
+			print("WARNING: ", rows[i], " conflicts with ", rows[j])
+			overlap_count += int(weight)
 
 	print("Hard group violations:", violation_count)
 	print("Soft group overlaps  :", overlap_count)
@@ -77,5 +77,4 @@ if __name__ == "__main__":
 
 
 	# Responsibly close our files
-	schedulefile.close()
-	groupsfile.close()
\ No newline at end of file
+	schedulefile.close()
\ No newline at end of file
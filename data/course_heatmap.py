@@ -1,32 +1,23 @@
-import csv, argparse
+import csv, argparse, os, sys
 import numpy as np
 import matplotlib.pyplot as plt
 
-
-
-parser = argparse.ArgumentParser(description='Make course heatmap')
-parser.add_argument("--names",
-                    action="store_true",
-                   help='Show course names on heatmap (for small datasets)')
-
-parser.add_argument("--data",
-					type=str,
-                   help='Filename to read from ')
-
-args = parser.parse_args()
+# timegrid.py lives in the top level of the project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import timegrid
 
 
 # Works with output files that have startTime, endTime, dayCode. Ex:
 #number,courseName,timeString,dayString,startTime,endTime,dayCode
 #0,AA 203, 9:00-10:30, TuTh,2,5,01010
 
-def make_heatmap_from_file(names=False)->None:
+def make_heatmap_from_file(filename:str, names=False, save:str=None)->None:
 	# We want it from 8am - 8pm in 30 minute increments
 	# that's 24 spaces x 5 days
 	grid = np.zeros((24,5), dtype=int)
 	labels = [["" for j in range(5)] for i in range(24)]
 
-	with open(args.data, "r") as infile:
+	with open(filename, "r") as infile:
 		# Use builtin csv reader
 		reader = csv.DictReader(infile)
 		for row in reader:
@@ -34,9 +25,9 @@ def make_heatmap_from_file(names=False)->None:
 			endTime   = int(row['endTime'])
 			dayCode   = row['dayCode']
 
+			grid += timegrid.to_grid(timegrid.occupancy(startTime, endTime, dayCode))[0:24,:]
 			for i,d in enumerate(dayCode):
 				if '1' == d:
-					grid[startTime:endTime,i] += np.ones(endTime-startTime, dtype=int)
 					if names:
 					# Labels - uncomment for VERY SMALL data sets where you can label individual courses
 						for t in range(startTime, endTime):
@@ -77,8 +68,24 @@ def make_heatmap_from_file(names=False)->None:
 			else:
 				text = ax.text(j,i,str(grid[i,j]), ha="center", va="center", color="w")
 
-	#plt.savefig(input("Save file as (include .png): "))
-	plt.show()
+	if save is not None:
+		plt.savefig(save)
+	else:
+		plt.show()
 
 if __name__ == "__main__":
-	make_heatmap_from_file(names=args.names)
\ No newline at end of file
+	parser = argparse.ArgumentParser(description='Make course heatmap')
+	parser.add_argument("--names",
+	                    action="store_true",
+	                   help='Show course names on heatmap (for small datasets)')
+
+	parser.add_argument("--data",
+						type=str,
+	                   help='Filename to read from ')
+
+	parser.add_argument("--save",
+						type=str,
+	                   help='Save the heatmap to this file instead of showing it')
+
+	args = parser.parse_args()
+	make_heatmap_from_file(args.data, names=args.names, save=args.save)
\ No newline at end of file
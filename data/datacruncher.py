@@ -4,7 +4,7 @@
 # Unittests   : None
 # Description :
 # Quick hack to ingest JSON data and spit out CSV files, will extend later
-# How to use  : Run file. Enter input JSON file when prompted and output CSV file name when prompted.
+# How to use  : python datacruncher.py INPUT.json OUTPUT.csv (or python cli.py ingest INPUT.json -o OUTPUT.csv)
 
 import json
 
@@ -84,9 +84,13 @@ def writeCourseToFile(course, outfile):
 
 
 if __name__ == "__main__":
-	infilename = input("Enter a JSON schedule file ")
-	with open(infilename, "r") as infile:
+	import argparse
+	parser = argparse.ArgumentParser(description="Convert a JSON schedule file to course data CSV")
+	parser.add_argument("infilename", help="JSON schedule file")
+	parser.add_argument("outfilename", help="Output file name (add .csv)")
+	args = parser.parse_args()
+
+	with open(args.infilename, "r") as infile:
 		
-		outfilename = input("Output file name (add .csv) ")
-		with open(outfilename, "w") as outfile:
+		with open(args.outfilename, "w") as outfile:
 			parseJsonData(infile, outfile)
\ No newline at end of file
@@ -0,0 +1,139 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Solve a course scheduling problem one connected component of its constraint graph
+# (conflictgraph.py) at a time. Courses with no chain of cantOverlap/shouldntOverlap links between
+# them only interact through terms summed over all courses, so each component is solved on its own,
+# with the particle swarm (main.run_swarm) or the integer program (ilp_solution.IlpModel), in a
+# process pool. Small components are packed into parts of at least min_size courses, so the pool
+# isn't flooded with one-course problems.
+# The PSO penalty (Ucsp.check_desirable) is a plain sum over courses and edges, so its parts are
+# just put together. The integer program's day spread term couples all courses: after putting the
+# parts together it is brought down by a greedy pass over the days (IlpModel.reconcile_days).
+# How to use  : python cli.py solve-pso DATA.csv --decompose (or solve-ilp DATA.csv --decompose)
+# Run file to compare the decomposed and whole integer programs.
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import main, coursedata, ilp_solution, milp
+from ucsp import Ucsp
+from conflictgraph import ConflictGraph
+
+# Parts are at least this many courses
+MIN_PART_SIZE = 20
+# Objective weights of IlpModel, passed on to the workers
+ILP_WEIGHTS = ["TIME_WEIGHT", "OVERLAP_WEIGHT", "DAY_SPREAD_WEIGHT", "CLUSTER_WEIGHT"]
+
+
+def split(data:coursedata.CourseData, min_size:int=MIN_PART_SIZE)->[np.array]:
+	'''The sorted course indices of each part: whole connected components, packed in order
+of their first course until the part has at least min_size courses (the last may have fewer).'''
+	n_components, labels = ConflictGraph.from_data(data).components()
+	components = np.split(np.argsort(labels, kind="stable"), np.cumsum(np.bincount(labels))[:-1])
+	parts, part = [], []
+	for component in components:
+		part.append(component)
+		if sum(len(c) for c in part) >= min_size:
+			parts.append(np.sort(np.concatenate(part)))
+			part = []
+	if part:
+		parts.append(np.sort(np.concatenate(part)))
+	return parts
+
+
+def _init_worker(data:coursedata.CourseData, worker_settings:dict, ilp_weights:dict):
+	global _worker_data
+	_worker_data = data
+	main.configure(**worker_settings)
+	for name, value in ilp_weights.items():
+		setattr(ilp_solution.IlpModel, name, value)
+
+def _solve_pso_part(idx:np.array, seed:np.random.SeedSequence, options:dict)->np.array:
+	best, in_points, out_points = main.run_swarm(_worker_data.subset(idx), seed=seed, **options)
+	return best.td
+
+def _solve_ilp_part(idx:np.array, good_times:np.array, solver:str, time_limit:float, gap:float)->(np.array, np.array):
+	model = ilp_solution.IlpModel(_worker_data.subset(idx), verbose=False, good_times=good_times)
+	result = milp.solve(model.problem, solver, time_limit, gap)
+	if result.value is None:
+		raise ValueError("No solution for courses {}: {}".format(idx.tolist(), result.status))
+	return model.values()
+
+
+def pool(data:coursedata.CourseData, n_workers:int=None)->ProcessPoolExecutor:
+	'''A process pool whose workers have the data and this process's solver settings.'''
+	ilp_weights = {name: getattr(ilp_solution.IlpModel, name) for name in ILP_WEIGHTS}
+	return ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(data, main.settings(), ilp_weights))
+
+
+def solve_pso(data:coursedata.CourseData, n_workers:int=None, min_size:int=MIN_PART_SIZE,
+              seed=None, **options)->Ucsp:
+	'''Run a swarm (see main.run_swarm) on each part in a pool of n_workers processes
+(default: one per CPU), and put the best schedules together. options are passed on to
+run_swarm, e.g. n_samples, n_rounds and k_max. Each part gets its own child seed,
+so the result doesn't depend on n_workers, and its own population_file and checkpoint_file,
+with _part<k> added to the names (see main.numbered_file).'''
+	parts = split(data, min_size)
+	root = np.random.SeedSequence(seed)
+	with pool(data, n_workers) as workers:
+		results = list(workers.map(_solve_pso_part, parts, root.spawn(len(parts)),
+		                           main.numbered_options(options, "part", len(parts))))
+
+	td = np.empty((len(data), 7), dtype=int)
+	for idx, part_td in zip(parts, results):
+		td[idx] = part_td
+	print("Solved {} parts of {} components".format(len(parts), ConflictGraph.from_data(data).components()[0]))
+	return Ucsp.from_placements(data, td, np.random.default_rng(root))
+
+
+def solve_ilp(data:coursedata.CourseData, solver:str=None, n_workers:int=None,
+              min_size:int=MIN_PART_SIZE, rng:np.random.Generator=None, max_sweeps:int=10,
+              time_limit:float=None, gap:float=None)->ilp_solution.IlpModel:
+	'''Solve the integer program of each part in a pool of n_workers processes (default: one per CPU),
+then reconcile the days of the whole schedule (see IlpModel.reconcile_days).
+solver, time_limit and gap are passed on to milp.solve for each part (default: the first installed
+solver): the time limit is per part, and each part keeps the best solution it found in that time.
+Returns the model of the whole problem, holding the solution (see IlpModel.set_values):
+its cluster penalty targets, drawn with rng, are the ones the parts were solved with.'''
+	model = ilp_solution.IlpModel(data, rng, verbose=False)
+	parts = split(data, min_size)
+	solver = milp.default_solver() if solver is None else solver
+	with pool(data, n_workers) as workers:
+		results = list(workers.map(_solve_ilp_part, parts, [model.good_times[idx] for idx in parts],
+		                           [solver]*len(parts), [time_limit]*len(parts), [gap]*len(parts)))
+
+	t = np.empty(model.J, dtype=int)
+	d = np.empty((model.J, ilp_solution.D), dtype=int)
+	for idx, (part_t, part_d) in zip(parts, results):
+		t[idx], d[idx] = part_t, part_d
+	before = model.set_values(t, d)
+	d, change = model.reconcile_days(t, d, max_sweeps)
+	after = model.set_values(t, d)
+	print("Solved {} parts with {}. Penalty: {} before reconciling the days, {} after".format(len(parts), solver, before, after))
+	return model
+
+
+# TEST CODE
+
+if __name__ == "__main__":
+	import sys, time
+
+	solver = milp.default_solver()
+	for infilename in sys.argv[1:] or ["data/spring_csv_data.csv", "data/winter_csv_data.csv",
+	                                   "data/Engineering_spring_2020.csv"]:
+		data = coursedata.load(infilename)
+		print("{}: {} courses, {} parts".format(infilename, len(data), len(split(data))))
+
+		start = time.perf_counter()
+		model = solve_ilp(data, solver, rng=np.random.default_rng(0))
+		t, d = model.values()
+		print("Decomposed: {:.1f} s, hard constraints hold? {}".format(time.perf_counter() - start,
+		      np.all(model.hard_satisfied(t, d, np.arange(len(model.hard_pairs))))))
+
+		if len(data) <= 100:
+			start = time.perf_counter()
+			whole = ilp_solution.IlpModel(data, np.random.default_rng(0), verbose=False)
+			result = milp.solve(whole.problem, solver)
+			print("Whole: {:.1f} s, penalty {}".format(time.perf_counter() - start, result.value))
@@ -3,74 +3,15 @@
 # Author(s)   : Emiko Soroka,
 # Unittests   : None
 # Description : Integer linear program solution to UCSP
+# How to use  : python cli.py solve-ilp DATA.csv (or python ilp_solution.py DATA.csv)
 
 import numpy as np
+import scipy.sparse as sp
 import cvxpy as cvx
-import csv
+import coursedata, timegrid, milp
+from conflictgraph import ConflictGraph, HARD, SOFT
 
 
-#  #  #  #  #  #  #  #  #
-#    Test data setup    #
-#  #  #  #  #  #  #  #  #
-
-infilename = input("Data file name: ")
-
-
-class_lengths       = []
-class_block_types   = []
-class_day_types     = []
-hard_overlap_groups = []
-soft_overlap_groups = []
-
-# We need the order of course names to enable nice printing at the end
-course_indices_to_names = {}
-
-infile = open(infilename, "r")
-
-# Use builtin csv reader
-reader = csv.DictReader(infile)
-for i, row in enumerate(reader):
-	class_day_types.append(int(row['numberOfMeetings']))
-	
-	# Retrieve the soft constraint group
-	soft_group = [int(g)-1 for g in row['shouldntOverlap'].split(";") if g != '']
-	if [] != soft_group:
-		# Don't forget to add this class to the group!
-		soft_group.append(int(row['dataNumber'])-1) # convert to 0-based indexing
-		soft_overlap_groups.append(soft_group)
-
-	# Retrieve the hard constraint group
-	hard_group = [int(g)-1 for g in row['cantOverlap'].split(";") if g != '']
-	if [] != hard_group:
-		hard_group.append(int(row['dataNumber'])-1)
-		hard_overlap_groups.append(hard_group)
-
-	# Handle the meetingLength
-	meetingLength = float(row['meetingLengthHours'])
-	block_type = 0
-	# Handle 1.5 hour blocks vs 1 hour blocks
-	if 0 == meetingLength % 1.5: # divisible by 1.5
-		block_type = 1.5
-		meetingLength += 0.5 # round up
-	else: # divisible by 1.0
-		block_type = 1.0
-	class_block_types.append(block_type)
-	class_lengths.append(int(meetingLength))
-
-	# Save the course name
-	course_indices_to_names[i] = row['courseNumber']
-
- # Number of classes
-J = len(class_lengths)
-# Close file
-infile.close()
-
-
-
-#  #  #  #  #  #  #  #  #
-#      Solver setup     #
-#  #  #  #  #  #  #  #  #
-
 D = 5 # length of day vector
 # Represent the times in half-hour blocks so the 1.5 hour classes
 # can be represented by integer variables
@@ -78,14 +19,14 @@ D = 5 # length of day vector
 FIRST_1_5_BLOCK = 1  # represents 9.00
 LAST_1_5_BLOCK  = 7 # represents 18:00
 # Range for 1 hour multiple classes
-FIRST_1_0_BLOCK = 1  # represents 8:00 
+FIRST_1_0_BLOCK = 1  # represents 8:00
 LAST_1_0_BLOCK  = 12 # represents 19:00
 
 BUSINESS_HOURS_START_1_0 = 2 # 9am
 BUSINESS_HOURS_START_1_5 = 1 # 9am
 BUSINESS_HOURS_END_1_0   = 10 # 5 - 6pm
 BUSINESS_HOURS_END_1_5   = 6  # 4:30 - 6pm
-#                1  2  3   4   5   6   7   8   9   10  11  12 
+#                1  2  3   4   5   6   7   8   9   10  11  12
 # 1.0 blocks are 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19
 #                1   2     3    4    5   6    7
 # 1.5 blocks are 9, 10:30, 12, 1:30, 3, 4:30, 6
@@ -101,235 +42,453 @@ A_2 = np.array([[1, 1, 0, 0, 0],
 				[0, 0, 1, 1, 0],
 				[0, 0, 0, 1, 1]], dtype=bool)
 
-
-d_var = cvx.Variable((J, D), boolean=True)
-t_var = cvx.Variable(J, integer=True)
-constraints = []
-
-
-# OBJECTIVE - Penalty function
-
-def penalty(t_var):
-	time_p = 0.0; overlap_p = 0.0; lunchtime_p = 0.0
-	fri_class_p = 0.0; mon_class_p = 0.0
-	
-	# First: Penalize classes at bad times
-	for j in range(J):
-		if 1.5 == class_block_types[j]:
-			# 0 if time is before end of business hours
-			# ex: if time is 7 (6pm - 7:30pm) and, (7-c)_+ = 1
-			time_p += cvx.pos(t_var[j] - BUSINESS_HOURS_END_1_5)
-			# 0 if time is after start of business hours
-			# example: if time is 1 (8am) and (2-1)
-			time_p += cvx.pos(BUSINESS_HOURS_START_1_5 - t_var[j])
-		else: 
-			time_p += cvx.pos(t_var[j] - BUSINESS_HOURS_END_1_5)
-			time_p += cvx.pos(BUSINESS_HOURS_START_1_0 - t_var[j])
-		
-		# penalty for Friday and Monday classes
-		# promotes MW and TuTh over WF for 2-days-per-week classes
-#		fri_class_p += d_var[j,-1]
-#		mon_class_p += d_var[j,:] - d_var[j,:]
-
-	# Second, Penalize classes overlapping in soft groups
-	for group in soft_overlap_groups:
-		for i in group:
-			for j in group:
-				if j > i: # avoid double penalty, e.g. 1<->2, 2<->1
-					print("Penalizing {}, {}".format(course_indices_to_names[i], course_indices_to_names[j]))
-					idx_1 = i; idx_2 = j;
-					# code reuse, beware
-					c1_start = t_var[idx_1]
-					c2_start = t_var[idx_2]
-					d1 = d_var[idx_1,:]
-					d2 = d_var[idx_2,:]
-
-					# handle the constraint between a 1.5 hour and 1 hour class
-					if 1.5 == class_block_types[idx_1] and 1.0 == class_block_types[idx_2]:
-						# Convert to 1 hour overlap
-						c1_start = c1_start + 1 + (c1_start-1)/2
-
-					elif 1.5 == class_block_types[idx_2] and 1.0 == class_block_types[idx_1]:
-						# Convert to 1 hour overlap
-						c2_start = c2_start + 1 + (c2_start-1)/2
-
-					# Add the penalty
-					# Want 0 >= cvx.max(d1 + d2) - 1
-					# if all are violated, e.g. positive
-					# we get a penalty
-					# Classes DO overlap when:
-					#   t1[ ]t2
-					# 1[      ]c2
-					# and max(d1 + d2) - 2 == 0 or -1
-					# min(-d1 + -d2) + 1 = 0 (no violation) or -1 (violation)
-					# so c1 - t1 + -10*(max(d1 + d2) - 2) >= 0 for overlap
-					# -c1 + t1 + 10*(max(d1 + d2) - 2) <= 0 for overlap
-					# Don't question it!
-					# It isn't a DCP error!
-					overlap_p += \
-					cvx.pos(c1_start - c2_start - (cvx.min(-d1 + -d2) + 2)) + \
-					cvx.pos(c1_start + class_lengths[j] - c2_start - (cvx.min(-d1 + -d2) + 2))
-					
-	# Third. Penalize classes occurring at lunchtime.
-	# Implemented with:
-	# Fourth. Penalize classes "bunched together" in time. e.g. all in the morning.
-	# This is necessary to spread the classes throughout the day.
-	# Use the idea that each class is slightly "attracted to" a random "good" time.
-	# That should spread them out.
-	# While we're at it, don't "attract" courses to lunchtime spots.
-	BEST_1_5_SPOTS = [1,2,4,5,6]*((J+4)//5)
-	BEST_1_0_SPOTS = [2,3,4,6,7,8]*((J+5)//6)
-	
-	cluster_penalty = 0.0
-	for j in range(J):
-		
-		#fri_class_p += d_var[j,-1]
-		#mon_class_p +=cvx.sum( d_var[j,0:-1])
-
-		if 1.5 == class_block_types[j]:
-			cluster_penalty += cvx.abs(t_var[j] - np.random.choice(BEST_1_5_SPOTS, replace=False))
-		else:
-			cluster_penalty += cvx.abs(t_var[j] - np.random.choice(BEST_1_0_SPOTS, replace=False))
-
-	# Fifth. Promote spreading courses out over the week, e.g. not clustered on a single day.
-	
-	# Averaging term - total number of course meetings / total days
-	AVG_MEETINGS_PER_DAY = np.sum(class_day_types)/D
-	# spread in days
-	day_spread = 0
-	for d in range(0,D):
-		day_spread += cvx.abs(cvx.sum(d_var[:,d]) - AVG_MEETINGS_PER_DAY)
-
-	# ADJUST RELATIVE WEIGHTS HERE
-	return 2*time_p + 10 * overlap_p + day_spread*1 + cluster_penalty*1
-
-# Set objective
-objective = cvx.Minimize(penalty(t_var))
-
-
-# CONSTRAINTS
-
-for j in range(J):
-	# Add constraints on class start/end times
-	lb, ub = FIRST_1_0_BLOCK, LAST_1_0_BLOCK
-		
-	if 1.5 == class_block_types[j]: # class divisible into 1.5 hour blocks
-		lb = FIRST_1_5_BLOCK
-		ub = LAST_1_5_BLOCK - (class_lengths[j]//1.5 - 1)
-
-	else: # divisble into 1.0 hours
-		lb = FIRST_1_0_BLOCK
-		ub = LAST_1_0_BLOCK - (class_lengths[j]//1 - 1)
- 
-	# print("Course {}, lb, {}, ub, {}".format(j, lb, ub))
-	constraints.append(t_var[j] <= ub)
-	constraints.append(t_var[j] >= lb)
-
-	# Add constraints on days
-	if 1 == class_day_types[j]:
-		constraints.append(cvx.sum(d_var[j,:]) == 1)
-	elif 2 == class_day_types[j]:
-		constraints.append(A_2 @ (d_var[j,:]).T <= 1)
-		constraints.append(cvx.sum(d_var[j,:]) == 2)
-	else:
-		constraints.append(d_var[j,:] == [True, False, True, False, True])
-
-
-def add_conflict(idx_1, idx_2, bool_idx, constraints):
-	# Conflict: c1 vs c2
-	# Either c1_start after c2_end or c2_end before c1_start
-	#     or c2_start after c1_end or c1_end before c2_start
-	# For each of these, define a binary variable in R4
-	# that selects which constraint is active
-	# Add hard overlap constraints between course 1 and 3
-
-	c1_start = t_var[idx_1]
-	c2_start = t_var[idx_2]
-	d1 = d_var[idx_1,:]
-	d2 = d_var[idx_2,:]
-
-	# handle the constraint between a 1.5 hour and 1 hour class
-	if 1.5 == class_block_types[idx_1]: # and 1.0 == class_block_types[idx_2]:
-		# Convert to 1 hour overlap
-		c1_start = c1_start + 1 + (c1_start-1)/2
-
-	if 1.5 == class_block_types[idx_2]: # and 1.0 == class_block_types[idx_1]:
-		# Convert to 1 hour overlap
-		c2_start = c2_start + 1 + (c2_start-1)/2
-
-	# Overlap constraint math:
-	# c1_start - c2_end >= 0 -> c1_start - c2_start >= c2_length
-	# c2_start - c1_end >= 0 -> c2_start - c1_start >= c1_length
-	#c1[   ]c1
-	#        c2[ ]c2
-	# c2_start - c1_start - c1_length >= 0.0 OR
-	# c1_start - c2_start - c2_length >= 0.0
-	# If this happens:
-	# [1 0 1 0 0]
-	# [0 0 1 0 1] -> sum = [1 0 2 0 1]
-	# max(d1 + d2) <= 1 for the constraint to hold
-	# So the constraints are:
-	# max(d1 + d2) <= 1 (no day overlap) OR (one of the time overlap checks)
-
-	overlap_ij = conflict_booleans[bool_idx,:]
-
-	constraints.append(c1_start - c2_start >= class_lengths[idx_2] + overlap_ij[0]*-100)
-	constraints.append(c2_start - c1_start >= class_lengths[idx_1] + overlap_ij[1]*-100)
-	constraints.append(cvx.max(d1 + d2) <= 1 + 10*overlap_ij[2])
-	constraints.append(cvx.sum(overlap_ij) <= 2) # At least one must hold
-
-
-# Cont the number of conflicts we have
-n_conflicts = 0
-for group in hard_overlap_groups:
-	for i in group:
-		for j in group:
-			if j > i:
-				print(i,j)
-				n_conflicts += 1 if j > 1 else 0
-
-print("There are ", n_conflicts, "conflicts")
-# Now we know how many conflicts there are, we can define booleans to control their constraints
-conflict_booleans = cvx.Variable((n_conflicts, 3), boolean=True)
-# Go over conflicts
-bool_idx = 0
-for group in hard_overlap_groups:
-	for i in group:
-		for j in group:
-			if j > i: # don't add double constraints, e.g. 1<->2 and 2<->1
-				print("Adding conflict:", i, j)
-				add_conflict(i, j, bool_idx, constraints)
-				bool_idx += 1
-
-
-problem = cvx.Problem(objective,constraints)
-problem.solve(solver = cvx.GLPK_MI)
-print("GLPK finished with status", problem.status)
-print("Penalty: ", problem.value)
-
 # Interpret the results
 hour_class_map = {1:("8:00",0), 2:("9:00",2), 3:("10:00",4), 4:("11:00",6), 5:("12:00",8), \
                   6:("13:00",10), 7:("14:00",12), 8:("15:00",14), 9:("16:00",16), \
                   10:("17:00",18), 11:("18:00",20), 12:("19:00",22)}
+# Codes are half-hours since 8:00, the grid in timegrid.py
 hour_5_class_map = {1:("9:00",2), 2:("10:30",5), 3:("12:00",8), 4:("1:30",11), \
-                    5:("3:00",14), 6:("4:30",17), 7:("6:00",21), 8:("7:30",24)}
+                    5:("3:00",14), 6:("4:30",17), 7:("6:00",20), 8:("7:30",23)}
+
+
+def selection(idx:np.array, J:int, values=1.0)->sp.csr_matrix:
+	'''Sparse (len(idx), J) matrix with values[p] at (p, idx[p]), so selection(idx, J) @ x == x[idx].'''
+	values = np.broadcast_to(np.asarray(values, dtype=float), idx.shape)
+	return sp.csr_matrix((values, (np.arange(len(idx)), idx)), shape=(len(idx), J))
 
 
 def get_days(d)->str:
 	day_names = ["M","Tu","W","Th","F"]
 	return "".join([day_names[i] for i in range(D) if 1 == d[i]])
 
-# Print the header and data
-print("number,courseName,timeString,dayString,startTime,endTime,dayCode")
-for j in range(J):
-	hour = ""
-	if 1.5 == class_block_types[j]:
-		start_hour, start_code = hour_5_class_map[t_var[j].value]
-		end_hour, end_code   = hour_5_class_map[t_var[j].value + class_lengths[j]//1.5]
-	else:
-		start_hour, start_code = hour_class_map[t_var[j].value]
-		end_hour, end_code   = hour_class_map[t_var[j].value + class_lengths[j]//1.0]
-
-	print("{},{}, {}-{}, {},{},{},{}".format(j, course_indices_to_names[j], \
-		                                   start_hour, end_hour, get_days(d_var[j,:].value), \
-		                                   start_code, end_code, "".join([str(int(d)) for d in d_var[j,:].value])))
+
+class IlpModel:
+	'''The integer program for one course data file.
+The variables are t_var (start block of each class), d_var (days of each class)
+and conflict_booleans (which way each hard conflict is resolved).
+The objective and constraints are built from vector expressions over all classes
+and sparse matrices over all soft and hard pairs (soft_pairs, hard_pairs): the edges of the
+constraint graph (conflictgraph.py), so each pair is penalized or constrained once.
+A soft pair listed several times is penalized with its weight (soft_weight).
+'''
+	# ADJUST RELATIVE WEIGHTS HERE
+	TIME_WEIGHT       = 2.0
+	OVERLAP_WEIGHT    = 10.0
+	DAY_SPREAD_WEIGHT = 1.0
+	CLUSTER_WEIGHT    = 1.0
+
+	def __init__(self, data:coursedata.CourseData, rng:np.random.Generator=None, verbose:bool=True,
+	             good_times:np.array=None):
+		'''Set up the variables, objective and constraints.
+rng: picks the random "good" times the cluster penalty attracts classes to (see penalty),
+unless they are given as good_times, one per class.
+verbose: print each soft and hard constraint pair as it is added.'''
+		self.verbose = verbose
+		self.good_times = good_times
+		self.incumbent = None # (t, d, conflict booleans, objective) of a warm start, see warm_start
+
+		#  #  #  #  #  #  #  #  #
+		#    Test data setup    #
+		#  #  #  #  #  #  #  #  #
+
+		self.class_lengths       = []
+		self.class_block_types   = []
+		self.class_day_types     = []
+
+		# We need the order of course names to enable nice printing at the end
+		self.course_indices_to_names = {}
+
+		for i in range(len(data)):
+			self.class_day_types.append(int(data.n_meetings[i]))
+
+			# Handle the meetingLength
+			meetingLength = float(data.meeting_length[i])
+			block_type = 0
+			# Handle 1.5 hour blocks vs 1 hour blocks
+			if 0 == meetingLength % 1.5: # divisible by 1.5
+				block_type = 1.5
+				meetingLength += 0.5 # round up
+			else: # divisible by 1.0
+				block_type = 1.0
+			self.class_block_types.append(block_type)
+			self.class_lengths.append(int(meetingLength))
+
+			# Save the course name
+			self.course_indices_to_names[i] = data.course_names[i]
+
+		# Number of classes
+		self.J = J = len(self.class_lengths)
+		self.class_lengths = np.array(self.class_lengths, dtype=int)
+		self.is_1_5 = np.array(self.class_block_types) == 1.5
+		# The soft and hard constraint pairs, i < j
+		self.graph = ConflictGraph.from_data(data)
+		soft_src, soft_dst, self.soft_weight = self.graph.edges(SOFT)
+		hard_src, hard_dst, hard_weight      = self.graph.edges(HARD)
+		self.soft_pairs = np.stack([soft_src, soft_dst], axis=1)
+		self.hard_pairs = np.stack([hard_src, hard_dst], axis=1)
+
+		#  #  #  #  #  #  #  #  #
+		#      Solver setup     #
+		#  #  #  #  #  #  #  #  #
+
+		self.d_var = cvx.Variable((J, D), boolean=True)
+		self.t_var = cvx.Variable(J, integer=True)
+		self.constraints = []
+
+		# Set objective
+		self.objective = cvx.Minimize(self.penalty(self.t_var, rng))
+
+		# CONSTRAINTS
+		self.add_bounds()
+
+		# One row of booleans per conflicting pair controls its constraints
+		# (pairs are i < j, so there are no double constraints, e.g. 1<->2 and 2<->1)
+		if self.verbose:
+			print("There are ", len(self.hard_pairs), "conflicts")
+			for i, j in self.hard_pairs:
+				print("Adding conflict:", i, j)
+		self.conflict_booleans = cvx.Variable((len(self.hard_pairs), 3), boolean=True)
+		self.add_conflicts()
+
+		self.problem = cvx.Problem(self.objective, self.constraints)
+
+
+	# OBJECTIVE - Penalty function
+
+	def penalty(self, t_var, rng:np.random.Generator=None):
+		J, d_var = self.J, self.d_var
+		is_1_5, class_lengths = self.is_1_5, self.class_lengths
+
+		# First: Penalize classes at bad times
+		# 0 if time is before end of business hours
+		# ex: if time is 7 (6pm - 7:30pm) and, (7-c)_+ = 1
+		# 0 if time is after start of business hours
+		# example: if time is 1 (8am) and (2-1)
+		business_start = np.where(is_1_5, BUSINESS_HOURS_START_1_5, BUSINESS_HOURS_START_1_0)
+		time_p = cvx.sum(cvx.pos(t_var - BUSINESS_HOURS_END_1_5)) + cvx.sum(cvx.pos(business_start - t_var))
+
+		# penalty for Friday and Monday classes
+		# promotes MW and TuTh over WF for 2-days-per-week classes
+#		fri_class_p += d_var[j,-1]
+#		mon_class_p += d_var[j,:] - d_var[j,:]
+
+		# Second, Penalize classes overlapping in soft groups
+		overlap_p = 0.0
+		if len(self.soft_pairs) > 0:
+			idx_1, idx_2 = self.soft_pairs[:,0], self.soft_pairs[:,1] # no double penalty, e.g. 1<->2, 2<->1
+			if self.verbose:
+				for i, j in self.soft_pairs:
+					print("Penalizing {}, {}".format(self.course_indices_to_names[i], self.course_indices_to_names[j]))
+
+			# handle the constraint between a 1.5 hour and 1 hour class:
+			# convert the 1.5 hour class to 1 hour blocks, c + 1 + (c-1)/2 = 1.5c + 0.5
+			convert_1 = is_1_5[idx_1] & ~is_1_5[idx_2]
+			convert_2 = is_1_5[idx_2] & ~is_1_5[idx_1]
+			# c1_start - c2_start for every pair
+			start_diff = (selection(idx_1, J, np.where(convert_1, 1.5, 1.0)) - \
+			              selection(idx_2, J, np.where(convert_2, 1.5, 1.0))) @ t_var + \
+			             0.5*(convert_1.astype(float) - convert_2)
+			# max(d1 + d2) for every pair
+			day_overlap = cvx.max((selection(idx_1, J) + selection(idx_2, J)) @ d_var, axis=1)
+
+			# Add the penalty
+			# Want 0 >= cvx.max(d1 + d2) - 1
+			# if all are violated, e.g. positive
+			# we get a penalty
+			# Classes DO overlap when:
+			#   t1[ ]t2
+			# 1[      ]c2
+			# and max(d1 + d2) - 2 == 0 or -1
+			# min(-d1 + -d2) + 1 = 0 (no violation) or -1 (violation)
+			# so c1 - t1 + -10*(max(d1 + d2) - 2) >= 0 for overlap
+			# -c1 + t1 + 10*(max(d1 + d2) - 2) <= 0 for overlap
+			# min(-d1 + -d2) + 2 == 2 - max(d1 + d2)
+			overlap_p = self.soft_weight @ cvx.pos(start_diff - 2 + day_overlap) + \
+			            self.soft_weight @ cvx.pos(start_diff + class_lengths[idx_2] - 2 + day_overlap)
+
+		# Third. Penalize classes occurring at lunchtime.
+		# Implemented with:
+		# Fourth. Penalize classes "bunched together" in time. e.g. all in the morning.
+		# This is necessary to spread the classes throughout the day.
+		# Use the idea that each class is slightly "attracted to" a random "good" time.
+		# That should spread them out.
+		# While we're at it, don't "attract" courses to lunchtime spots.
+		rng = np.random.default_rng(rng)
+		BEST_1_5_SPOTS = [1,2,4,5,6]*((J+4)//5)
+		BEST_1_0_SPOTS = [2,3,4,6,7,8]*((J+5)//6)
+		if self.good_times is None:
+			self.good_times = np.array([rng.choice(BEST_1_5_SPOTS if is_1_5[j] else BEST_1_0_SPOTS, replace=False)
+			                            for j in range(J)], dtype=float)
+		cluster_penalty = cvx.sum(cvx.abs(t_var - self.good_times))
+
+		# Fifth. Promote spreading courses out over the week, e.g. not clustered on a single day.
+
+		# Averaging term - total number of course meetings / total days
+		AVG_MEETINGS_PER_DAY = np.sum(self.class_day_types)/D
+		# spread in days
+		day_spread = cvx.sum(cvx.abs(cvx.sum(d_var, axis=0) - AVG_MEETINGS_PER_DAY))
+
+		return self.TIME_WEIGHT*time_p + self.OVERLAP_WEIGHT*overlap_p + \
+		       self.DAY_SPREAD_WEIGHT*day_spread + self.CLUSTER_WEIGHT*cluster_penalty
+
+
+	def add_bounds(self):
+		t_var, d_var, constraints = self.t_var, self.d_var, self.constraints
+		# Add constraints on class start/end times
+		# class divisible into 1.5 hour blocks, or divisble into 1.0 hours
+		lb = np.where(self.is_1_5, FIRST_1_5_BLOCK, FIRST_1_0_BLOCK)
+		ub = np.where(self.is_1_5, LAST_1_5_BLOCK - (self.class_lengths//1.5 - 1),
+		                           LAST_1_0_BLOCK - (self.class_lengths//1 - 1))
+		constraints.append(t_var <= ub)
+		constraints.append(t_var >= lb)
+		self.t_lb, self.t_ub = lb.astype(int), ub.astype(int)
+
+		# Add constraints on days
+		day_types = np.array(self.class_day_types)
+		once  = np.flatnonzero(day_types == 1)
+		twice = np.flatnonzero(day_types == 2)
+		other = np.flatnonzero((day_types != 1) & (day_types != 2))
+		if len(once) > 0:
+			constraints.append(cvx.sum(d_var[once,:], axis=1) == 1)
+		if len(twice) > 0:
+			constraints.append(d_var[twice,:] @ A_2.T <= 1)
+			constraints.append(cvx.sum(d_var[twice,:], axis=1) == 2)
+		if len(other) > 0:
+			constraints.append(d_var[other,:] == np.tile([True, False, True, False, True], (len(other), 1)))
+
+
+	def add_conflicts(self):
+		# Conflict: c1 vs c2, for every pair (idx_1, idx_2) in hard_pairs at once
+		# Either c1_start after c2_end or c2_end before c1_start
+		#     or c2_start after c1_end or c1_end before c2_start
+		# For each of these, define a binary variable in R4
+		# that selects which constraint is active
+		if len(self.hard_pairs) == 0:
+			return
+		J = self.J
+		idx_1, idx_2 = self.hard_pairs[:,0], self.hard_pairs[:,1]
+
+		# handle the constraint between a 1.5 hour and 1 hour class:
+		# convert every 1.5 hour class to 1 hour blocks, c + 1 + (c-1)/2 = 1.5c + 0.5
+		start = cvx.multiply(np.where(self.is_1_5, 1.5, 1.0), self.t_var) + 0.5*self.is_1_5
+		# Signed incidence matrix: row p of incidence @ start is c1_start - c2_start of pair p
+		incidence = selection(idx_1, J) - selection(idx_2, J)
+		start_diff = incidence @ start
+		# Unsigned: row p of abs(incidence) @ d_var is d1 + d2
+		day_overlap = cvx.max(abs(incidence) @ self.d_var, axis=1)
+
+		# Overlap constraint math:
+		# c1_start - c2_end >= 0 -> c1_start - c2_start >= c2_length
+		# c2_start - c1_end >= 0 -> c2_start - c1_start >= c1_length
+		#c1[   ]c1
+		#        c2[ ]c2
+		# c2_start - c1_start - c1_length >= 0.0 OR
+		# c1_start - c2_start - c2_length >= 0.0
+		# If this happens:
+		# [1 0 1 0 0]
+		# [0 0 1 0 1] -> sum = [1 0 2 0 1]
+		# max(d1 + d2) <= 1 for the constraint to hold
+		# So the constraints are:
+		# max(d1 + d2) <= 1 (no day overlap) OR (one of the time overlap checks)
+
+		overlap = self.conflict_booleans
+		self.constraints.append(start_diff >= self.class_lengths[idx_2] + overlap[:,0]*-100)
+		self.constraints.append(-start_diff >= self.class_lengths[idx_1] + overlap[:,1]*-100)
+		self.constraints.append(day_overlap <= 1 + 10*overlap[:,2])
+		self.constraints.append(cvx.sum(overlap, axis=1) <= 2) # At least one must hold
+
+
+	def solve(self, solver:str=None, time_limit:float=None, gap:float=None)->milp.MilpResult:
+		'''Solve the problem with one of the milp.py backends (default: the first installed),
+for at most time_limit seconds or until the incumbent is within relative gap of the optimum.
+Prints and returns the outcome: the incumbent's penalty, the bound on the optimum and the gap.
+After warm_start, solvers which take an initial point start from the warm start, and if
+the solver finds nothing better the warm start is kept as the solution.'''
+		result = milp.solve(self.problem, solver, time_limit, gap, warm_start=self.incumbent is not None)
+		print("{} finished with status {} in {:.2f} s".format(result.solver, result.status, result.time))
+		if self.incumbent is not None and (result.value is None or result.value > self.incumbent[3]):
+			t, d, b, value = self.incumbent
+			self.t_var.value, self.d_var.value, self.conflict_booleans.value = t, d, b
+			result = result._replace(value=value, gap=milp.relative_gap(value, result.bound))
+			print("Keeping the warm start")
+		print("Penalty: ", result.value)
+		print("Bound: {}, gap: {}".format(result.bound, result.gap))
+		return result
+
+
+	def encode(self, schedule, repair:bool=True)->(np.array, np.array, np.array):
+		'''Map a schedule of the same courses (a ucsp.Ucsp) to values of t_var, d_var and
+conflict_booleans. Each start time (in half-hours since 8:00, see timegrid.py) goes to the
+nearest start block of the class's kind, within its bounds, and the days are kept.
+This model's hard constraints are a little stricter than ucsp's (1.5 hour classes are rounded
+up to 2 hours), so with repair, the few conflicts this breaks are moved apart (see repair).
+Each conflict's booleans relax the constraints which don't hold.'''
+		start = timegrid.UCSP_SLOT_START[schedule.td[:,0]]
+		t = np.where(self.is_1_5, np.rint((start - 2)/3) + 1, np.rint(start/2) + 1)
+		t = np.clip(t, self.t_lb, self.t_ub).astype(int)
+		d = schedule.td[:,2:].copy()
+		if repair:
+			t, d = self.repair(t, d)
+		b = (~self.conflict_holds(t, d, np.arange(len(self.hard_pairs)))).astype(int)
+		return t, d, b
+
+
+	def repair(self, t:np.array, d:np.array)->(np.array, np.array):
+		'''Move apart the hard pairs whose conflict constraints can't hold at start blocks t and
+days d: one class of each such pair goes to the nearest start block and day pattern at which
+all of its hard pairs hold, if there is one. Returns the new t and d.'''
+		t, d = t.copy(), d.copy()
+		for row in np.flatnonzero(~self.hard_satisfied(t, d, np.arange(len(self.hard_pairs)))):
+			for j in self.hard_pairs[row][::-1]:
+				if self.hard_satisfied(t, d, [row])[0]:
+					break
+				rows = self.graph.incident(j, HARD)
+				old_t, old_d = t[j], d[j].copy()
+				candidates = [(abs(new_t - old_t) + np.sum(pattern != old_d), new_t, k)
+				              for new_t in range(self.t_lb[j], self.t_ub[j] + 1)
+				              for k, pattern in enumerate(self.day_patterns(j))]
+				for distance, new_t, k in sorted(candidates):
+					t[j], d[j] = new_t, self.day_patterns(j)[k]
+					if np.all(self.hard_satisfied(t, d, rows)):
+						break
+				else:
+					t[j], d[j] = old_t, old_d
+		return t, d
+
+
+	def warm_start(self, schedule, cutoff:bool=True)->float:
+		'''Start from a schedule of the same courses (a ucsp.Ucsp), e.g. the best one found by
+main.run_swarm. Its encoding (see encode) becomes the variables' values, which solvers that
+take an initial point start from. If it is feasible for this model it is the incumbent: with
+cutoff, the objective is bounded by its value, so any solver can prune the branches which can't
+beat it, and solve() keeps it if the solver finds nothing.
+Returns its objective value, or None if it breaks a constraint of this model (the model's
+hard constraints are a little stricter than ucsp's, since 1.5 hour classes are rounded up
+to 2 hours).'''
+		t, d, b = self.encode(schedule)
+		self.t_var.value, self.d_var.value, self.conflict_booleans.value = t, d, b
+		if any(np.any(constraint.violation() > 1e-6) for constraint in self.constraints):
+			return None
+
+		value = self.objective.value
+		self.incumbent = (t, d, b, value)
+		if cutoff:
+			self.problem = cvx.Problem(self.objective, self.constraints + [self.objective.args[0] <= value + 1e-6])
+		return value
+
+
+	def values(self)->(np.array, np.array):
+		'''The solved start blocks t (J,) and days d (J, 5), rounded to integers.'''
+		return np.rint(self.t_var.value).astype(int), np.rint(self.d_var.value).astype(int)
+
+
+	def set_values(self, t:np.array, d:np.array)->float:
+		'''Set the start blocks and days, e.g. put together from other models' solutions,
+so schedule_rows() prints them. Returns the objective there.'''
+		self.t_var.value, self.d_var.value = t, d
+		return self.objective.value
+
+
+	def day_patterns(self, j:int)->np.array:
+		'''The (P, 5) day patterns class j may take under the day constraints (see add_bounds).'''
+		if 1 == self.class_day_types[j]:
+			return np.eye(D, dtype=int)
+		elif 2 == self.class_day_types[j]:
+			# every pair of different days, which A_2 allows
+			patterns = (np.eye(D, dtype=int)[:,None] + np.eye(D, dtype=int)[None]).reshape(-1, D)
+			allowed = (np.max(patterns, axis=1) == 1) & np.all(patterns @ A_2.T <= 1, axis=1)
+			return np.unique(patterns[allowed], axis=0)
+		return np.array([[1, 0, 1, 0, 1]])
+
+
+	def soft_overlaps(self, t:np.array, d:np.array, rows:np.array)->np.array:
+		'''The overlap penalty (see penalty) of soft pairs soft_pairs[rows] at start blocks t and days d.'''
+		idx_1, idx_2 = self.soft_pairs[rows,0], self.soft_pairs[rows,1]
+		convert_1 = self.is_1_5[idx_1] & ~self.is_1_5[idx_2]
+		convert_2 = self.is_1_5[idx_2] & ~self.is_1_5[idx_1]
+		start_diff = np.where(convert_1, 1.5*t[idx_1] + 0.5, t[idx_1]) - np.where(convert_2, 1.5*t[idx_2] + 0.5, t[idx_2])
+		day_overlap = np.max(d[idx_1] + d[idx_2], axis=-1)
+		return self.soft_weight[rows]*(np.maximum(start_diff - 2 + day_overlap, 0) + \
+		                               np.maximum(start_diff + self.class_lengths[idx_2] - 2 + day_overlap, 0))
+
+
+	def conflict_holds(self, t:np.array, d:np.array, rows:np.array)->np.array:
+		'''Which of the three conflict constraints (see add_conflicts) of hard pairs hard_pairs[rows]
+hold at start blocks t and days d, as a (len(rows), 3) array: the first class after the second,
+the second after the first, on different days.'''
+		idx_1, idx_2 = self.hard_pairs[rows,0], self.hard_pairs[rows,1]
+		start = np.where(self.is_1_5, 1.5*t + 0.5, t)
+		start_diff = start[idx_1] - start[idx_2]
+		return np.stack([start_diff >= self.class_lengths[idx_2], -start_diff >= self.class_lengths[idx_1],
+		                 np.max(d[idx_1] + d[idx_2], axis=-1) <= 1], axis=-1)
+
+
+	def hard_satisfied(self, t:np.array, d:np.array, rows:np.array)->np.array:
+		'''Whether the conflict constraints (see add_conflicts) of hard pairs hard_pairs[rows]
+can hold at start blocks t and days d: apart in time, or on different days.'''
+		return np.any(self.conflict_holds(t, d, rows), axis=-1)
+
+
+	def reconcile_days(self, t:np.array, d:np.array, max_sweeps:int=10)->(np.array, float):
+		'''Greedy pass over the days of a solution with fixed start blocks t, for the global day spread
+term when the parts of the problem were solved separately (see decompose.py). In each sweep every
+class takes the allowed day pattern which lowers the day spread and soft overlap penalty the most,
+without breaking a hard constraint. Returns the new days and the change in the objective.'''
+		d = d.copy()
+		average = np.sum(self.class_day_types)/D
+		counts = np.sum(d, axis=0)
+		total = 0.0
+		for sweep in range(max_sweeps):
+			improvement = 0.0
+			for j in range(self.J):
+				patterns = self.day_patterns(j)
+				if len(patterns) < 2:
+					continue
+				soft = self.graph.incident(j, SOFT)
+				hard = self.graph.incident(j, HARD)
+				old = d[j].copy()
+				deltas = np.empty(len(patterns))
+				for k, pattern in enumerate(patterns):
+					d[j] = pattern
+					if not np.all(self.hard_satisfied(t, d, hard)):
+						deltas[k] = np.inf
+						continue
+					new_counts = counts - old + pattern
+					deltas[k] = self.DAY_SPREAD_WEIGHT*(np.sum(np.abs(new_counts - average)) - np.sum(np.abs(counts - average))) + \
+					            self.OVERLAP_WEIGHT*np.sum(self.soft_overlaps(t, d, soft))
+				d[j] = old
+				deltas -= self.OVERLAP_WEIGHT*np.sum(self.soft_overlaps(t, d, soft))
+				best = int(np.argmin(deltas))
+				if deltas[best] < -1e-9:
+					d[j] = patterns[best]
+					counts += patterns[best] - old
+					improvement += deltas[best]
+			total += improvement
+			if improvement == 0.0:
+				break
+		return d, total
+
+
+	def schedule_rows(self)->[str]:
+		'''The solved schedule as CSV lines (with header) in the format read by
+compute_penalty.py and data/course_heatmap.py.'''
+		rows = ["number,courseName,timeString,dayString,startTime,endTime,dayCode"]
+		for j in range(self.J):
+			t = int(round(self.t_var[j].value))
+			d = np.rint(self.d_var[j,:].value).astype(int)
+			if 1.5 == self.class_block_types[j]:
+				start_hour, start_code = hour_5_class_map[t]
+				end_hour, end_code   = hour_5_class_map[t + self.class_lengths[j]//1.5]
+			else:
+				start_hour, start_code = hour_class_map[t]
+				end_hour, end_code   = hour_class_map[t + self.class_lengths[j]//1.0]
+
+			rows.append("{},{}, {}-{}, {},{},{},{}".format(j, self.course_indices_to_names[j], \
+				                                       start_hour, end_hour, get_days(d), \
+				                                       start_code, end_code, "".join([str(x) for x in d])))
+		return rows
+
+
+if __name__ == "__main__":
+	import sys, cli
+	cli.main(["solve-ilp"] + sys.argv[1:])
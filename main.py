@@ -5,175 +5,310 @@
 # Description :
 # Main file for course scheduling problem
 
-from ucsp import Course, Ucsp
+import ucsp
+from ucsp import Ucsp
 import particleswarm
-import csv
-import copy
+import coursedata
 import numpy as np
-import matplotlib.pyplot as plt
-import datetime
-
-if __name__ == "__main__":
-	print("Initializing some random schedules:")
-	infilename = input("Data file name: ")
+import os, json
+from concurrent.futures import ProcessPoolExecutor
+
+N_SAMPLES = 20 # particles per swarm
+N_ROUNDS  = 10 # rounds of iteration_phase + local_search_phase
+N_ITERATIONS = 10 # PSO iterations per round (k_max of iteration_phase)
+N_RUNS    = 1  # independent swarms; more than 1 runs them in parallel with multi_start
+CACHE_CAPACITY = 4096 # penalties remembered per swarm (see ucsp.PenaltyCache); 0 turns the cache off
+POPULATION_FILE = None # .npy file to memory-map the swarm's state to, for very large swarms
+
+
+def open_population(filename:str, n_samples:int, n:int)->dict:
+	'''Memory-mapped swarm state for n_samples schedules of n courses: "td", the (n_samples, n, 7)
+placements, in filename (a .npy file), and "v" and "x_best", the (n_samples, n) velocities and
+personal bests, in the files next to it with _v and _x_best added to the name.'''
+	stem = filename[:-len(".npy")] if filename.endswith(".npy") else filename
+	return {"td":     np.lib.format.open_memmap(filename, "w+", int, (n_samples, n, 7)),
+	        "v":      np.lib.format.open_memmap(stem + "_v.npy", "w+", float, (n_samples, n)),
+	        "x_best": np.lib.format.open_memmap(stem + "_x_best.npy", "w+", float, (n_samples, n))}
+
+
+def init_samples(data:coursedata.CourseData, n_samples:int, rng:np.random.Generator=None,
+                 population:dict=None)->([Ucsp], [float], int):
+	'''Generate n_samples random schedules. Infeasible ones are re-placed with
+Ucsp.construct_feasible, and only dropped if that fails too.
+Each sample gets its own random stream, spawned from rng. The samples are copies of one
+template schedule (see Ucsp.copy), so only their placements and particle state are per sample.
+population: optional dict of "td" (n_samples, N, 7) int, "v" and "x_best" (n_samples, N) float
+arrays, e.g. from open_population, to keep the samples' state in. Sample k's td is then
+population["td"][k], and so on.
+Returns the samples, their penalties and the number of samples discarded.'''
+	samples = []
+	in_points = []
+	n_discarded = 0
+	cache = ucsp.PenaltyCache(CACHE_CAPACITY) if CACHE_CAPACITY > 0 else None
+
+	template = None
+	for k, sample_rng in enumerate(np.random.default_rng(rng).spawn(n_samples)):
+		td = Ucsp.random_placements(data, sample_rng)
+		if template is None:
+			template = Ucsp.from_placements(data, td)
+		if population is not None:
+			population["td"][k] = td
+			td = population["td"][k]
+		schedule = template.copy(td, sample_rng)
+		particle_state(schedule, population, k)
+		schedule.cache = cache
+		if schedule.hard_violations() == 0 or schedule.construct_feasible():
+			samples.append(schedule)
+			in_points.append(schedule.check_desirable())
+		else:
+			n_discarded += 1
+
+	return samples, in_points, n_discarded
+
+
+def particle_state(sample:Ucsp, population:dict=None, k:int=None):
+	'''Give a sample its velocity and personal best arrays: row k of the population
+arrays (see init_samples), or new ones. iteration_phase updates them in place.'''
+	if population is not None:
+		sample.v, sample.x_best = population["v"][k], population["x_best"][k]
+	else:
+		sample.v, sample.x_best = np.empty(len(sample)), np.empty(len(sample))
+
+
+# Define iteration phase
+def iteration_phase(samples, k_max, w=1, c1=1, c2=1):
+
+	# All samples schedule the same courses, so any one of them can score the whole swarm
+	problem = samples[0]
+	def swarm_penalties():
+		return problem.check_desirable_many(samples)
+
+	y = swarm_penalties()
+	best = np.argmin(y)
+	x_best, y_best = samples[best].get_all_time_vectors(), y[best]
+	for sample, penalty in zip(samples, y):
+		if getattr(sample, "v", None) is None:
+			particle_state(sample)
+		sample.v[:] = 1
+		sample.x_best[:] = sample.get_all_time_vectors()
+		sample.y_best = penalty
+
+
+	# Iterate
+	n = len(problem)
+	for k in range(0, k_max):
+		for i, sample in enumerate(samples):
+			r1, r2 = sample.rng.integers(0,4,n, dtype=int), \
+			         sample.rng.integers(0,4,n, dtype=int)
+			
+			x = sample.add_all_time_vectors(sample.v)
+			#print("x + v\n", x)
+			# OK so we want to kind of "decay" the iinitial velocity
+			# and replace it with a better one # this kind of replaces w parameter for now (HACK)
+			sample.v[:] = sample.v//2 + c1*np.multiply(r1, (sample.x_best - x)) + \
+			                      c2*np.multiply(r2,(x_best - x))
+
+		# Score every particle in one call, then update the personal and global bests
+		y = swarm_penalties()
+		for sample, penalty in zip(samples, y):
+			if penalty < sample.y_best:
+				sample.x_best[:], sample.y_best = sample.get_all_time_vectors(), penalty
+		best = np.argmin(y)
+		if y[best] < y_best:
+			x_best[:], y_best = samples[best].get_all_time_vectors(), y[best]
+
+	return samples
+
+
+
+# Define local search phase
+def local_search_phase(samples):
+	# OK we're done with particles flying around
+	# Let's try to see if there's any local improvements
+	for j, sample in enumerate(samples):
+		sample.local_search()
+		#print(j, sample.check_desirable())
 	
-	file_rows = []
-	with open(infilename, "r") as infile:
-		# Use builtin csv reader
-		reader = csv.DictReader(infile)
-		for row in reader:
-			file_rows.append(row)
+	return samples
+
+
+CHECKPOINT_VERSION = 2
+
+def save_checkpoint(filename:str, samples:[Ucsp], in_points:[float], n_discarded:int, n_done:int):
+	'''Save the swarm after n_done rounds of run_swarm: every sample's placement (position),
+velocity, personal best and random stream state, in one binary .npz file.
+(The global best is the best personal best, found again at the start of each round.)
+The file is replaced atomically, so a run killed while saving keeps the previous checkpoint.
+'''
+	tmpname = filename + ".tmp.npz"
+	np.savez(tmpname, version=CHECKPOINT_VERSION, n_done=n_done, n_discarded=n_discarded,
+	         in_points=np.array(in_points, dtype=float),
+	         td=np.stack([sample.td for sample in samples]),
+	         v=np.stack([sample.v for sample in samples]),
+	         x_best=np.stack([sample.x_best for sample in samples]),
+	         y_best=np.array([sample.y_best for sample in samples], dtype=float),
+	         rng_states=np.array([json.dumps(sample.rng.bit_generator.state) for sample in samples]))
+	os.replace(tmpname, filename)
+
+
+def load_checkpoint(filename:str, data:coursedata.CourseData, population:dict=None)->([Ucsp], [float], int, int):
+	'''Rebuild the swarm saved by save_checkpoint, in the population arrays if given (see init_samples).
+Returns the samples, their initial penalties, the number discarded and the number of rounds done.'''
+	with np.load(filename) as checkpoint:
+		if int(checkpoint['version']) != CHECKPOINT_VERSION or checkpoint['td'].shape[1] != len(data):
+			raise ValueError("{} is not a checkpoint of this problem".format(filename))
+		states = [json.loads(state) for state in checkpoint['rng_states']]
+		cache = ucsp.PenaltyCache(CACHE_CAPACITY) if CACHE_CAPACITY > 0 else None
+		samples = []
+		template = Ucsp.from_placements(data, checkpoint['td'][0])
+		for k, state in enumerate(states):
+			rng = np.random.Generator(getattr(np.random, state['bit_generator'])())
+			rng.bit_generator.state = state
+			td = checkpoint['td'][k]
+			if population is not None:
+				population["td"][k] = td
+				td = population["td"][k]
+			sample = template.copy(td, rng)
+			particle_state(sample, population, k)
+			sample.cache = cache
+			sample.v[:], sample.x_best[:], sample.y_best = checkpoint['v'][k], checkpoint['x_best'][k], float(checkpoint['y_best'][k])
+			samples.append(sample)
+		return samples, list(checkpoint['in_points']), int(checkpoint['n_discarded']), int(checkpoint['n_done'])
+
+
+def run_swarm(data:coursedata.CourseData, n_samples:int=N_SAMPLES, n_rounds:int=N_ROUNDS, seed=None,
+              population_file:str=None, checkpoint_file:str=None, resume:bool=False,
+              k_max:int=N_ITERATIONS, c1=1, c2=1)->(Ucsp, [float], np.array):
+	'''Run one swarm: random initialization, then n_rounds of PSO (k_max iterations with
+coefficients c1, c2, see iteration_phase) and local search.
+seed: anything numpy.random.default_rng accepts, e.g. an int, a SeedSequence or a Generator.
+population_file: if given, the sample placements, velocities and personal bests live in
+memory-mapped .npy files: this one and two next to it (see open_population).
+checkpoint_file: if given, the swarm is saved there after every round (see save_checkpoint).
+resume: continue from checkpoint_file, if it exists, instead of starting over.
+A resumed run gives exactly the same results as one which wasn't interrupted.
+Returns the best final schedule, the initial penalties and the final penalties.'''
+	population = None
+	if population_file is not None:
+		population = open_population(population_file, n_samples, len(data))
+
+	if resume and checkpoint_file is not None and os.path.exists(checkpoint_file):
+		samples, in_points, n_discarded, n_done = load_checkpoint(checkpoint_file, data, population)
+		print("Resuming after round {} of {}".format(n_done, n_rounds))
+	else:
+		samples, in_points, n_discarded = init_samples(data, n_samples, np.random.default_rng(seed), population)
+		n_done = 0
+		print("Feasible initial samples: {} ({} discarded)".format(len(samples), n_discarded))
+
+	for i in range(n_done, n_rounds):
+		samples = iteration_phase(samples, k_max, c1=c1, c2=c2)
+		samples = local_search_phase(samples)
+		if checkpoint_file is not None:
+			save_checkpoint(checkpoint_file, samples, in_points, n_discarded, i + 1)
 
-	N_SAMPLES = 20
+	# The particle moves ignore the hard constraints, so fix up the final schedules
+	for sample in samples:
+		sample.repair()
 
-	samples = []
-	in_points = []
+	out_points = np.zeros(len(samples))
+	for i, sample in enumerate(samples):
+		out_points[i] = sample.check_desirable()
 
-	for k in range(N_SAMPLES):
-		random_schedule = []	
-	
-		for row in file_rows:
-			# Exclude TBA classes because they have no timing information
-			random_schedule.append( \
-			Course.init_random(float(row['meetingLengthHours']), 
-			               	int(row['numberOfMeetings']),
-			               	row['courseNumber'],
-			               	int(row['numberEnrolled']),
-			               	row['cantOverlap'],
-			               	row['shouldntOverlap']))
-	
-		ucsp = Ucsp(random_schedule)
-		if ucsp.check_feasible():
-			samples.append(ucsp)
-			in_points.append(ucsp.check_desirable())
+	cache = samples[0].cache
+	if cache is not None:
+		print("Penalty cache: {} hits, {} misses".format(cache.hits, cache.misses))
 
+	return samples[np.argmin(out_points)], in_points, out_points
 
-	# Compare the best schedules
-	best_init_idx = np.argmin(in_points)
-	print("Best initial (random) schedule: penalty = ", in_points[best_init_idx])
-
-
-	# Define iteration phase
-	def iteration_phase(samples, k_max, w=1, c1=1, c2=1):
-
-		x_best = np.zeros(N_SAMPLES*2)
-		y_best = np.Inf
-		for sample in samples:
-			#print("Random schedule is feasible?", sample.check_feasible())
-			penalty =sample.check_desirable()
-			if penalty < y_best:
-				y_best = penalty
-				x_best = sample.get_all_time_vectors()
-			#print("Random schedule is good? Penalty:", penalty)
-			sample.v = np.ones(len(sample.schedule), dtype=int)
-			sample.x_best = sample.get_all_time_vectors()
-			#for name in sample.schedule.keys():
-				#print(name, sample.schedule[name])
-
-
-		# Iterate
-		n = len(samples[0].schedule)
-		for k in range(0, k_max):
-			for i, sample in enumerate(samples):
-				x = sample.get_all_time_vectors()
-				r1, r2 = np.random.randint(0,4,n, dtype=int), \
-				         np.random.randint(0,4,n, dtype=int)
-				
-				x = sample.add_all_time_vectors(sample.v)
-				#print("x + v\n", x)
-				# OK so we want to kind of "decay" the iinitial velocity
-				# and replace it with a better one # this kind of replaces w parameter for now (HACK)
-				sample.v = sample.v//2 + c1*np.multiply(r1, (sample.x_best - x)) + \
-				                   c2*np.multiply(r2,(x_best - x))
-				
-				y = sample.check_desirable()
-				
-				if y < y_best:
-					x_best[:], y_best = x, y
-				if y < sample.check_desirable():
-					sample.x_best[:] = x
-
-				#print(k*k_max+i, y)
-
-		return samples
-
-
-
-	# Define local search phase
-	def local_search_phase(samples):
-		# OK we're done with particles flying around
-		for j, sample in enumerate(samples):
-
-			# Let's try to see if there's any local improvements
-			x = sample.get_all_time_vectors()
-			delta_x = np.zeros(np.shape(x), dtype=int)
-			value = sample.check_desirable()
-			
-			# Attempt to improve on value in each element of x
-			for i, xi in enumerate(x):
 
-				delta_x[i] = 1
+# Course data for the multi_start workers, sent once per worker process rather than once per run
+_worker_data = None
 
-				# Check in one direction
-				sample_copy = Ucsp(copy.deepcopy(sample.schedule))
+def settings()->dict:
+	'''The solver settings of this process, to apply in another one with configure().'''
+	return {"backend": ucsp.BACKEND, "weights": Ucsp.weights(), "cache_capacity": CACHE_CAPACITY}
 
-				xp = sample_copy.add_all_time_vectors(delta_x)
-				value_p = sample_copy.check_desirable()
+def configure(backend:str=None, weights:dict=None, cache_capacity:int=None):
+	'''Set the penalty backend (see ucsp.set_backend), penalty weights (see Ucsp.set_weights)
+and penalty cache capacity. Settings given as None are left alone.'''
+	global CACHE_CAPACITY
+	if backend is not None:
+		ucsp.set_backend(backend)
+	if weights is not None:
+		Ucsp.set_weights(**weights)
+	if cache_capacity is not None:
+		CACHE_CAPACITY = cache_capacity
 
-				# Check in the other direction
-				sample_copy = Ucsp(copy.deepcopy(sample.schedule))
-				
-				xm = sample_copy.add_all_time_vectors(-1*delta_x)
-				value_m = sample_copy.check_desirable()
+def _init_worker(data:coursedata.CourseData, worker_settings:dict):
+	global _worker_data
+	_worker_data = data
+	configure(**worker_settings)
 
+def _run_worker(n_samples:int, n_rounds:int, seed:np.random.SeedSequence, options:dict):
+	return run_swarm(_worker_data, n_samples, n_rounds, seed, **options)
 
-				# an improvement in + direction, set it to x+
-				if value_p < value_m and value_p < value:
-					sample.add_all_time_vectors(delta_x)
-				
-				# improvement in - direction is better
-				elif value_m < value:
-					sample.add_all_time_vectors(-delta_x)
-				
-				value = sample.check_desirable()
-				delta_x[i] = 0
-				#print("New value:", sample.check_desirable())
 
+FILE_OPTIONS = ["population_file", "checkpoint_file"]
 
-			#print(j, value)
-		
-		return samples
+def numbered_file(filename:str, label:str, k:int)->str:
+	'''The file of run (or part) k of several, e.g. numbered_file("swarm.npz", "run", 2) is "swarm_run2.npz".'''
+	if filename is None:
+		return None
+	stem, ext = os.path.splitext(filename)
+	return "{}_{}{}{}".format(stem, label, k, ext)
 
+def numbered_options(options:dict, label:str, n:int)->[dict]:
+	'''n copies of run_swarm options, each with its own numbered population and checkpoint files.'''
+	return [dict(options, **{name: numbered_file(options[name], label, k) for name in FILE_OPTIONS if name in options})
+	        for k in range(n)]
 
-	for i in range(10):
-		samples = iteration_phase(samples, 10)
-		samples = local_search_phase(samples)
-		
-	
 
-	print("\nFinal:")
+def multi_start(data:coursedata.CourseData, n_runs:int, n_workers:int=None, n_samples:int=N_SAMPLES,
+                n_rounds:int=N_ROUNDS, seed=None, **options)->(int, [tuple]):
+	'''Run n_runs independent swarms (see run_swarm) with different seeds in a process pool
+of n_workers processes (default: one per CPU). options are passed on to run_swarm,
+e.g. k_max. Run k gets its own population_file and checkpoint_file, with _run<k> added to
+the names (see numbered_file), so with resume every run continues from its own checkpoint.
+The workers use this process's settings (see configure).
+Returns the index of the run with the best schedule, and every run's result.'''
+	# Independent child streams, so the results don't depend on n_workers
+	seeds = np.random.SeedSequence(seed).spawn(n_runs)
+	with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(data, settings())) as pool:
+		results = list(pool.map(_run_worker, [n_samples]*n_runs, [n_rounds]*n_runs, seeds,
+		                        numbered_options(options, "run", n_runs)))
 
-	out_points = np.zeros(len(samples))
-	for i, sample in enumerate(samples):
-		print("Random schedule is feasible?", sample.check_feasible())
-		penalty = sample.check_desirable()
-		out_points[i] = penalty
+	best_run = int(np.argmin([best.check_desirable() for best, in_points, out_points in results]))
+	return best_run, results
+
+
+def report(best:Ucsp, in_points:[float], out_points:np.array, plot_file:str=None):
+	'''Print the results of run_swarm, and plot the initial and final penalties to plot_file.'''
+	# Compare the best schedules
+	print("Best initial (random) schedule: penalty = ", np.min(in_points))
+
+	print("\nFinal:")
+	for penalty in out_points:
 		print("Random schedule is good? Penalty:", penalty)
+	print("Best schedule is feasible?", best.check_feasible())
 
 
 	# Plot
-	
-	x_plot = np.linspace(0, len(in_points),len(in_points))
-	plt.scatter(x_plot,in_points, label="Initial")
-	plt.scatter(x_plot,out_points, label="Final")
-	plt.legend()
-	plt.ylabel("Penalty")
-	plt.xlabel("Sample number")
-	plt.savefig("Plot_{}.png".format(datetime.datetime.now()))
+	if plot_file is not None:
+		import matplotlib.pyplot as plt
+		x_plot = np.linspace(0, len(in_points),len(in_points))
+		plt.scatter(x_plot,in_points, label="Initial")
+		plt.scatter(x_plot,out_points, label="Final")
+		plt.legend()
+		plt.ylabel("Penalty")
+		plt.xlabel("Sample number")
+		plt.savefig(plot_file)
 	
 	# Compare the best schedules
-	best_final_idx = np.argmin(out_points)
-	print("Best final schedule: penalty = ", out_points[best_final_idx])
-	for course in samples[best_final_idx].schedule:
+	print("Best final schedule: penalty = ", np.min(out_points))
+	for course in best.schedule:
 		print(course)
 
+
+if __name__ == "__main__":
+	import sys, cli
+	cli.main(["solve-pso"] + sys.argv[1:])
@@ -0,0 +1,147 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11, cvxpy 1.9, scipy 1.16
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Solver backends for the integer program (ilp_solution.py).
+# GLPK_MI and CBC are called through cvxpy, HiGHS through scipy.optimize.milp. Every backend takes
+# a wall clock time limit and a relative gap to stop at, and returns a MilpResult: the best solution
+# found (the incumbent, left in the problem's variables), its objective, the best bound on the
+# optimum and the gap between them, whether or not the solve finished.
+# How to use  : result = milp.solve(problem, "HIGHS", time_limit=60, gap=0.01)
+# Run file to solve the spring data's integer program with every installed backend.
+
+import collections, time
+import numpy as np
+import scipy.optimize
+import cvxpy as cvx
+import cvxpy.settings
+
+# Backends, in order of preference
+SOLVERS = [cvx.GLPK_MI, cvx.CBC, cvx.HIGHS]
+
+# Outcomes of a solve
+OPTIMAL     = "optimal"     # the incumbent is optimal (within the gap, if one was given)
+FEASIBLE    = "feasible"    # stopped by the time limit with an incumbent
+NO_SOLUTION = "no_solution" # stopped by the time limit (or failed) without one
+INFEASIBLE  = "infeasible"
+
+# solver: backend name, status: one of the outcomes above, value: objective of the incumbent
+# (None without one), bound: lower bound on the optimum (None if the backend doesn't give one),
+# gap: (value - bound)/|value| (None if either is unknown), time: wall clock seconds
+MilpResult = collections.namedtuple("MilpResult", ["solver", "status", "value", "bound", "gap", "time"])
+
+
+def available()->[str]:
+	'''The installed backends, in order of preference.'''
+	installed = cvx.installed_solvers()
+	return [solver for solver in SOLVERS if solver in installed or
+	        (solver == cvx.HIGHS and hasattr(scipy.optimize, "milp"))]
+
+
+def default_solver()->str:
+	'''The first installed backend, GLPK_MI if it is installed.'''
+	solvers = available()
+	if not solvers:
+		raise ValueError("No integer programming solver installed: install cvxopt (GLPK_MI), cylp (CBC) or scipy >= 1.9 (HiGHS)")
+	return solvers[0]
+
+
+def relative_gap(value:float, bound:float)->float:
+	'''(value - bound)/|value|, the gap as GLPK, CBC and HiGHS report it.'''
+	if value is None or bound is None:
+		return None
+	if value == bound:
+		return 0.0
+	return max(value - bound, 0.0)/abs(value) if value != 0 else np.inf
+
+
+def solve(problem:cvx.Problem, solver:str=None, time_limit:float=None, gap:float=None,
+          warm_start:bool=False, verbose:bool=False)->MilpResult:
+	'''Solve an integer program with one of the backends (default: default_solver()),
+stopping after time_limit seconds or once the incumbent is within relative gap of the optimum.
+The incumbent is left in the problem's variables. warm_start is passed on to cvxpy, for
+solvers which start from the variables' values.'''
+	solver = default_solver() if solver is None else solver.upper()
+	if solver not in available() and solver not in cvx.installed_solvers():
+		raise ValueError("{} isn't installed (installed: {})".format(solver, ", ".join(available())))
+	start = time.perf_counter()
+	if solver in [cvx.HIGHS, cvx.SCIPY]:
+		status, value, bound = _solve_highs(problem, time_limit, gap, verbose)
+	else:
+		status, value, bound = _solve_cvxpy(problem, solver, time_limit, gap, warm_start, verbose)
+	return MilpResult(solver, status, value, bound, relative_gap(value, bound), time.perf_counter() - start)
+
+
+def _solve_highs(problem:cvx.Problem, time_limit:float, gap:float, verbose:bool)->(str, float, float):
+	'''HiGHS through scipy.optimize.milp, on the data cvxpy's SCIPY interface builds for it.
+milp returns the incumbent and the dual bound even when it runs out of time.'''
+	options = {"method": "highs", "disp": verbose}
+	if time_limit is not None:
+		options["time_limit"] = time_limit
+	if gap is not None:
+		options["mip_rel_gap"] = gap
+	data, chain, inverse_data = problem.get_problem_data(cvx.SCIPY)
+	result = chain.solver.solve_via_data(data, False, verbose, {"scipy_options": options})
+
+	if result.status == 2:
+		return INFEASIBLE, None, None
+	if result.x is None:
+		return NO_SOLUTION, None, None
+	problem.unpack_results(result, chain, inverse_data)
+	# The objective's constant term, which milp doesn't see
+	offset = inverse_data[-1][cvxpy.settings.OFFSET]
+	bound = getattr(result, "mip_dual_bound", None)
+	bound = problem.value if bound is None else float(bound + offset)
+	return OPTIMAL if result.status == 0 else FEASIBLE, float(problem.value), bound
+
+
+def _cvxpy_options(solver:str, time_limit:float, gap:float)->dict:
+	'''The time limit and gap options of a solver, in cvxpy's solve(**options) form.'''
+	options = {}
+	if solver == cvx.GLPK_MI:
+		# cvxopt's GLPK options: milliseconds and the relative gap
+		if time_limit is not None:
+			options["tm_lim"] = int(1000*time_limit)
+		if gap is not None:
+			options["mip_gap"] = gap
+	elif solver == cvx.CBC:
+		if time_limit is not None:
+			options["maximumSeconds"] = time_limit
+		if gap is not None:
+			options["allowableFractionGap"] = gap
+	elif time_limit is not None or gap is not None:
+		raise ValueError("Time limits and gaps are only supported with {}".format(", ".join(SOLVERS)))
+	return options
+
+
+def _solve_cvxpy(problem:cvx.Problem, solver:str, time_limit:float, gap:float,
+                 warm_start:bool, verbose:bool)->(str, float, float):
+	'''Any other cvxpy solver. cvxpy doesn't report a bound, so only the gap the solver was
+asked to stop at gives one: bound = value - gap*|value| for an optimal solve.'''
+	try:
+		problem.solve(solver=solver, warm_start=warm_start, verbose=verbose,
+		              **_cvxpy_options(solver, time_limit, gap))
+	except cvx.SolverError:
+		return NO_SOLUTION, None, None
+
+	if problem.status in [cvx.INFEASIBLE, cvx.INFEASIBLE_INACCURATE]:
+		return INFEASIBLE, None, None
+	if problem.status not in cvxpy.settings.SOLUTION_PRESENT or problem.value is None:
+		return NO_SOLUTION, None, None
+	if problem.status == cvx.OPTIMAL:
+		return OPTIMAL, float(problem.value), problem.value - (gap or 0.0)*abs(problem.value)
+	return FEASIBLE, float(problem.value), None
+
+
+# TEST CODE
+
+if __name__ == "__main__":
+	import coursedata, ilp_solution
+
+	print("Installed:", ", ".join(available()))
+	data = coursedata.load("data/spring_csv_data.csv")
+	for solver in available():
+		model = ilp_solution.IlpModel(data, np.random.default_rng(0), verbose=False)
+		print(solve(model.problem, solver))
+		model = ilp_solution.IlpModel(coursedata.load("data/Engineering_spring_2020.csv"), np.random.default_rng(0), verbose=False)
+		print("Engineering, 0.5 s:", solve(model.problem, solver, time_limit=0.5))
@@ -6,7 +6,8 @@
 # Particle swarm algorithm implementation, based on "Algorithms for Optimization" chapter 9.
 # How to use  : Run file for demo
 
-import copy
+import os, pickle, queue, traceback
+import multiprocessing
 import numpy as np
 
 class Particle:
@@ -16,42 +17,261 @@ class Particle:
 		self.x_best = x_best
 
 
+# Island model topologies: given the number of islands,
+# list the islands each island sends its migrants to.
+TOPOLOGIES = {
+	"ring"            : lambda n: [[(i+1) % n] for i in range(n)],
+	"bidirectional"   : lambda n: [sorted({(i-1) % n, (i+1) % n} - {i}) for i in range(n)],
+	"fully_connected" : lambda n: [[j for j in range(n) if j != i] for i in range(n)],
+}
+
+
 class ParticleSwarm:
-	def __init__(self, f:callable, population:np.array, w=1, c1=1, c2=1):
+	def __init__(self, f:callable, population:[Particle], w=1, c1=1, c2=1, batch=False,
+	             rng:np.random.Generator=None):
 		self.f     = f     # objective function which takes x, f : R^n -> R
-		self.pop   = population # Initial population
 		self.w     = w     # inertia coefficient
 		self.c1    = c1    # momentum coefficients
 		self.c2    = c2
+		self.batch = batch # if True, f takes a (P, n) population and returns P values
+		self.rng   = np.random.default_rng(rng) # random stream (a Generator, or a seed for one)
+		self.chunk = None  # particles updated and evaluated at a time; None for all at once
+		self.memmap_dir = None # directory of the population files, if memory-mapped (see to_memmap)
 
-	def run(self, k_max:int)->np.array:
-		# Algorithm from page 159
-		# Initialization
-		n = len(self.pop[0].x)
-		x_best, y_best = copy.deepcopy(self.pop[0].x_best), np.Inf
+		# Initial population, stored as (P, n) arrays: one row per particle
+		self.x       = np.array([p.x for p in population], dtype=float)
+		self.v       = np.array([p.v for p in population], dtype=float)
+		self.x_pbest = np.array([p.x_best for p in population], dtype=float)
+		self.y_pbest = None # personal best values, computed on the first run()
+
+		# Global best, kept between calls to run() so a swarm can be run in stages
+		self.x_best, self.y_best = None, np.inf
+
+	@classmethod
+	def from_arrays(cls, f:callable, x:np.array, v:np.array, x_pbest:np.array=None, y_pbest:np.array=None,
+	                w=1, c1=1, c2=1, batch=False, rng:np.random.Generator=None)->"ParticleSwarm":
+		'''Build a swarm directly from (P, n) position, velocity and personal best arrays.'''
+		swarm = cls(f, [], w, c1, c2, batch, rng)
+		swarm.x, swarm.v = np.array(x, dtype=float), np.array(v, dtype=float)
+		swarm.x_pbest = np.copy(swarm.x) if x_pbest is None else np.array(x_pbest, dtype=float)
+		swarm.y_pbest = None if y_pbest is None else np.array(y_pbest, dtype=float)
+		return swarm
+
+	@property
+	def pop(self)->[Particle]:
+		'''The population as Particles. Their arrays are views of the swarm's rows.'''
+		return [Particle(self.x[i], self.v[i], self.x_pbest[i]) for i in range(len(self.x))]
+
+	def blocks(self)->[slice]:
+		'''Split the particles into blocks of self.chunk rows.'''
+		P = len(self.x)
+		chunk = P if self.chunk is None else max(1, self.chunk)
+		return [slice(start, min(start + chunk, P)) for start in range(0, P, chunk)]
 
-		# Find the best value in the initial population
-		for p in self.pop:
-			y = self.f(p.x)
-			if y < y_best:
-				x_best[:], y_best = p.x, y
+	def evaluate(self, x:np.array)->np.array:
+		'''Objective values of a (P, n) population, in one call to f (per block) if it takes a batch.'''
+		if self.batch:
+			if self.chunk is None or len(x) <= self.chunk:
+				return np.asarray(self.f(x), dtype=float)
+			return np.concatenate([np.asarray(self.f(x[rows]), dtype=float) for rows in self.blocks()])
+		return np.array([self.f(xi) for xi in x], dtype=float)
+
+	def init_bests(self):
+		'''Evaluate the personal bests and find the global best, unless already done.'''
+		if self.y_pbest is None:
+			# One objective pass over the personal bests (which start out as the positions)
+			self.y_pbest = self.evaluate(self.x_pbest)
+		if self.x_best is None:
+			# Find the best value in the initial population
+			best = np.argmin(self.y_pbest)
+			self.x_best, self.y_best = np.copy(self.x_pbest[best]), self.y_pbest[best]
+
+	def run(self, k_max:int)->[Particle]:
+		# Algorithm from page 159, with the whole population (or a block of self.chunk
+		# particles at a time) updated at once. The arrays are updated in place,
+		# so memory-mapped populations stay on disk.
+		# Initialization
+		self.init_bests()
 
 		# Iterate
 		for k in range(0, k_max):
-			for p in self.pop:
-				r1, r2 = np.random.rand(n), np.random.rand(n)
-				p.x = np.add(p.x, p.v) # velocity
-				p.v = self.w*p.v + self.c1*r1*(p.x_best - p.x) + \
-				                   self.c2*r2*(x_best - p.x)
-				y = self.f(p.x)
-				if y < y_best:
-					x_best[:], y_best = p.x, y
-				if y < self.f(p.x_best):
-					p.x_best[:] = p.x
+			x_best, y_best = self.x_best, self.y_best
+			for rows in self.blocks():
+				x, v = self.x[rows], self.v[rows] # views
+				r1, r2 = self.rng.random(x.shape), self.rng.random(x.shape)
+				x += v # velocity
+				v *= self.w
+				v += self.c1*r1*(self.x_pbest[rows] - x)
+				v += self.c2*r2*(self.x_best - x)
+				y = self.evaluate(x)
+
+				# Personal bests are cached, so each particle is evaluated once per iteration
+				improved = y < self.y_pbest[rows]
+				self.x_pbest[rows][improved], self.y_pbest[rows][improved] = x[improved], y[improved]
+				best = np.argmin(y)
+				if y[best] < y_best:
+					x_best, y_best = np.copy(x[best]), y[best]
+			# The global best moves once per iteration, as if all blocks were updated together
+			self.x_best, self.y_best = x_best, y_best
+
+		return self.pop
+
+	def to_memmap(self, directory:str, chunk:int=4096):
+		'''Move the population into .npy files in directory (x, v, x_pbest, y_pbest),
+memory-mapped so that only the block being updated has to be in RAM.
+Worker processes (e.g. in run_islands) then share the population without copying it,
+and the files always hold the latest population. chunk sets self.chunk.
+'''
+		os.makedirs(directory, exist_ok=True)
+		self.chunk = chunk
+		self.init_bests()
+		for name in self.MEMMAP_FIELDS:
+			array = getattr(self, name)
+			mm = np.lib.format.open_memmap(os.path.join(directory, name + ".npy"), "w+", float, array.shape)
+			for rows in self.blocks():
+				mm[rows] = array[rows]
+			setattr(self, name, mm)
+		self.memmap_dir = directory
 
+	@classmethod
+	def open_memmap(cls, f:callable, directory:str, w=1, c1=1, c2=1, batch=False,
+	                rng:np.random.Generator=None, chunk:int=4096)->"ParticleSwarm":
+		'''Open a population written by to_memmap, e.g. from another process.
+Updates are written to the same files.'''
+		swarm = cls(f, [], w, c1, c2, batch, rng)
+		for name in cls.MEMMAP_FIELDS:
+			setattr(swarm, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode="r+"))
+		swarm.chunk, swarm.memmap_dir = chunk, directory
+		# The global best is always one of the personal bests
+		swarm.init_bests()
+		return swarm
+
+	MEMMAP_FIELDS = ["x", "v", "x_pbest", "y_pbest"]
+
+	def emigrants(self, n_migrants:int=1)->[(np.array, float)]:
+		'''The n_migrants best personal bests in the swarm, as (x, y) pairs.'''
+		return [(np.copy(self.x_pbest[i]), self.y_pbest[i]) for i in np.argsort(self.y_pbest, kind="stable")[:n_migrants]]
+
+	def immigrate(self, migrants:[(np.array, float)]):
+		'''Replace the worst particles (by personal best) with migrants from another swarm.
+A migrant keeps the velocity of the particle it replaces.'''
+		worst = np.argsort(self.y_pbest, kind="stable")[::-1]
+		for i, (x, y_migrant) in zip(worst, migrants):
+			if y_migrant < self.y_pbest[i]:
+				self.x[i], self.x_pbest[i], self.y_pbest[i] = x, x, y_migrant
+			if y_migrant < self.y_best:
+				self.x_best, self.y_best = np.copy(x), y_migrant
+
+	def run_islands(self, k_max:int, n_islands:int=4, migration_interval:int=10,
+	                topology="ring", n_migrants:int=1)->[Particle]:
+		'''Island model: split the population into n_islands sub-swarms, each run in its own process.
+Every migration_interval iterations each island sends its n_migrants best particles
+to its neighbours, which replace their worst particles with them.
+topology: a name from TOPOLOGIES, or a list giving the destination islands of each island.
+f has to be picklable, e.g. a module-level function or a bound method such as Ucsp.penalty_at.
+Each island gets its own random stream, spawned from self.rng.
+Returns the merged final population; the global best is in self.x_best, self.y_best.
+'''
+		if not 1 <= n_islands <= len(self.x):
+			raise ValueError("n_islands must be between 1 and the number of particles ({}), got {}".format(len(self.x), n_islands))
+		destinations = TOPOLOGIES[topology](n_islands) if isinstance(topology, str) else topology
+		sources = [[i for i in range(n_islands) if island in destinations[i]] for island in range(n_islands)]
+		bounds = np.cumsum([0] + [len(part) for part in np.array_split(np.arange(len(self.x)), n_islands)])
+		parts = [slice(bounds[i], bounds[i+1]) for i in range(n_islands)]
+		shared = self.memmap_dir is not None
+		if shared:
+			# Islands are views of the memory-mapped files, which forked workers write to directly
+			islands = []
+			for part, rng in zip(parts, self.rng.spawn(n_islands)):
+				island = ParticleSwarm(self.f, [], self.w, self.c1, self.c2, self.batch, rng)
+				island.x, island.v, island.x_pbest = self.x[part], self.v[part], self.x_pbest[part]
+				island.y_pbest = None if self.y_pbest is None else self.y_pbest[part]
+				island.chunk = self.chunk
+				islands.append(island)
+		else:
+			islands = [ParticleSwarm.from_arrays(self.f, self.x[part], self.v[part], self.x_pbest[part],
+			           None if self.y_pbest is None else self.y_pbest[part], self.w, self.c1, self.c2, self.batch, rng)
+			           for part, rng in zip(parts, self.rng.spawn(n_islands))]
+
+		# Forked workers inherit f, so it needn't be importable by name
+		ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+		inboxes = [ctx.Queue() for island in range(n_islands)]
+		results = ctx.Queue()
+		workers = [ctx.Process(target=_island_worker, args=(islands[i], i, k_max, migration_interval,
+		                       n_migrants, destinations[i], sources[i], inboxes, results, shared))
+		           for i in range(n_islands)]
+		for worker in workers:
+			worker.start()
+		try:
+			finished = sorted(_collect_islands(workers, results), key=lambda result: result[0])
+		finally:
+			# After a failure the other islands may be waiting for migrants which never come
+			for worker in workers:
+				if worker.is_alive():
+					worker.terminate()
+				worker.join()
+
+		islands = [swarm for island, swarm in finished]
+		if not shared:
+			self.x       = np.concatenate([swarm.x for swarm in islands])
+			self.v       = np.concatenate([swarm.v for swarm in islands])
+			self.x_pbest = np.concatenate([swarm.x_pbest for swarm in islands])
+			self.y_pbest = np.concatenate([swarm.y_pbest for swarm in islands])
+		for swarm in islands:
+			if swarm.y_best < self.y_best:
+				self.x_best, self.y_best = swarm.x_best, swarm.y_best
 		return self.pop
 
 
+def _island_worker(swarm:ParticleSwarm, island:int, k_max:int, migration_interval:int, n_migrants:int,
+                   destinations:[int], sources:[int], inboxes:list, results, shared:bool=False):
+	'''Run one island of ParticleSwarm.run_islands, migrating every migration_interval iterations.
+Puts (island, swarm) on results, or (island, exception, traceback) if the island fails.'''
+	try:
+		for k in range(0, k_max, migration_interval):
+			swarm.run(min(migration_interval, k_max - k))
+			if k + migration_interval >= k_max:
+				break
+			migrants = swarm.emigrants(n_migrants)
+			for dst in destinations:
+				inboxes[dst].put((island, migrants))
+			# Wait for every neighbour, then take their migrants in a fixed order
+			arrivals = sorted([inboxes[island].get() for src in sources], key=lambda arrival: arrival[0])
+			for src, migrants in arrivals:
+				swarm.immigrate(migrants)
+		if shared:
+			# The population is already in the shared files, so only send back the island's best
+			swarm.x = swarm.v = swarm.x_pbest = swarm.y_pbest = None
+		results.put((island, swarm))
+	except Exception as error:
+		try:
+			pickle.dumps(error)
+		except Exception:
+			error = RuntimeError(repr(error))
+		results.put((island, error, traceback.format_exc()))
+
+
+def _collect_islands(workers:list, results, poll:float=0.1)->list:
+	'''The (island, swarm) results of the _island_worker processes. Re-raises an island's
+exception, and raises RuntimeError if a worker dies without sending a result.'''
+	finished, dead = {}, set()
+	while len(finished) < len(workers):
+		try:
+			result = results.get(timeout=poll)
+		except queue.Empty:
+			# A worker which has exited may still have its result in the queue, so give it one more poll
+			gone = {i for i, worker in enumerate(workers) if i not in finished and not worker.is_alive()}
+			for i in gone & dead:
+				raise RuntimeError("Island {} exited with code {} without a result".format(i, workers[i].exitcode))
+			dead = gone
+			continue
+		if len(result) == 3:
+			island, error, trace = result
+			raise error from RuntimeError("Island {} failed:\n{}".format(island, trace))
+		finished[result[0]] = result
+	return list(finished.values())
+
+
 if __name__ == "__main__":
 	print("Self-test on Wheeler's Ridge: f* = 0, x* = [1.0, 1.5]")
 	# test on a small objective function
@@ -61,13 +281,14 @@ if __name__ == "__main__":
 		return -np.exp(-(x1*x2 - a)**2 - (x2 - a)**2) + 1
 
 	n = 2
-	init_x = [np.random.rand(2) for i in range(20)]
+	rng = np.random.default_rng(0) # seeded, so the self-test is reproducible
+	init_x = [rng.random(2) for i in range(20)]
 	init_population = [Particle(x=x, v=np.ones(n), x_best=x) for x in init_x]
 
-	ps = ParticleSwarm(wheelers_ridge, init_population)
+	ps = ParticleSwarm(wheelers_ridge, init_population, rng=rng)
 	final_population = ps.run(20); # Number of iterations
-	best_f = np.Inf
-	best_x = np.ones(n)*np.Inf
+	best_f = np.inf
+	best_x = np.ones(n)*np.inf
 	for p in final_population:
 		#print("x: ", p.x)
 		#print("v: ", p.v)
@@ -76,4 +297,32 @@ if __name__ == "__main__":
 		if fp < best_f:
 			best_f = fp; best_x = p.x_best
 
-	print("\nBest x overall:", best_x, "\nwith f:", best_f)
\ No newline at end of file
+	print("\nBest x overall:", best_x, "\nwith f:", best_f)
+
+	print("\nIsland model, 4 islands of 20 particles on a ring:")
+	init_x = [rng.random(2) for i in range(80)]
+	init_population = [Particle(x=x, v=np.ones(n), x_best=np.copy(x)) for x in init_x]
+	ps = ParticleSwarm(wheelers_ridge, init_population, rng=rng)
+	ps.run_islands(20, n_islands=4, migration_interval=5)
+	print("Best x overall:", ps.x_best, "\nwith f:", ps.y_best)
+
+	print("\nVectorized objective, 1000 particles:")
+	def wheelers_ridge_batch(x, a = 1.5):
+		x1 = x[:,0]; x2 = x[:,1]
+		return -np.exp(-(x1*x2 - a)**2 - (x2 - a)**2) + 1
+	init_x = rng.random((1000, n))
+	ps = ParticleSwarm.from_arrays(wheelers_ridge_batch, init_x, np.ones((1000, n)), batch=True, rng=rng)
+	ps.run(20)
+	print("Best x overall:", ps.x_best, "\nwith f:", ps.y_best)
+
+	print("\nMemory-mapped population, 10000 particles in blocks of 1000, 4 islands:")
+	import tempfile
+	with tempfile.TemporaryDirectory() as directory:
+		ps = ParticleSwarm.from_arrays(wheelers_ridge_batch, rng.random((10000, n)), np.ones((10000, n)),
+		                               batch=True, rng=rng)
+		ps.to_memmap(directory, chunk=1000)
+		ps.run_islands(20, n_islands=4, migration_interval=5)
+		reopened = ParticleSwarm.open_memmap(wheelers_ridge_batch, directory, batch=True)
+		print("Best x overall:", ps.x_best, "\nwith f:", ps.y_best)
+		print("Files hold the final population?", reopened.y_best == ps.y_best)
+		del ps, reopened
\ No newline at end of file
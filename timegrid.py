@@ -0,0 +1,72 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Shared half-hour occupancy encoding of course placements.
+# A placement (time block + days) is packed into a Python int with one bit per
+# (day, half-hour) cell of the week, so two placements overlap iff (a & b) != 0.
+
+# The grid runs from 8:00am to midnight in 30 minute steps, 32 cells per day:
+#0 : 8:00a - 8:30a
+#1 : 8:30a - 9:00a
+#2 : 9:00a - 9:30a
+# ...
+#23: 7:30p - 8:00p
+# ...
+#31:11:30p - 12:00a
+# The solvers only use 8:00a - 8:00p (cells 0 - 23), but real schedules have evening classes.
+# This is the same grid as the startTime/endTime codes written by ilp_solution.py
+# and read by compute_penalty.py and data/course_heatmap.py. End codes are exclusive,
+# e.g. a 9:00a - 10:30a class is startTime = 2, endTime = 5.
+# Bit (day*32 + halfhour) is set if the class meets then, with day 0 = Monday.
+
+import numpy as np
+
+N_HALF_HOURS = 32
+N_DAYS       = 5
+
+# Half-hour codes of the 18 ucsp time indices (see the table at the top of ucsp.py).
+# Indices 0 - 10 are the hour slots from 9:00a, 11 - 17 the 1.5 hour slots from 9:00a.
+UCSP_SLOT_START = np.array([2 + 2*s for s in range(11)] + [2 + 3*s for s in range(7)], dtype=int)
+UCSP_SLOT_END   = np.array([4 + 2*s for s in range(11)] + [5 + 3*s for s in range(7)], dtype=int)
+
+
+def time_bits(start:int, end:int)->int:
+	'''Bits for half-hours start (inclusive) to end (exclusive) of a single day.'''
+	start, end = int(start), int(end) # Python ints, so the shifts in occupancy() can't overflow
+	if end <= start:
+		return 0
+	return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+
+def occupancy(start:int, end:int, days)->int:
+	'''Pack a placement into its occupancy bitmask.
+start, end: half-hour codes, end exclusive.
+days: 5 day flags, either a sequence of 0/1 or a dayCode string such as "01010".
+'''
+	bits = time_bits(start, end)
+	mask = 0
+	for day, flag in enumerate(days):
+		if int(flag):
+			mask |= bits << (day*N_HALF_HOURS)
+	return mask
+
+
+def ucsp_occupancy(t1:int, t2:int, days)->int:
+	'''Occupancy bitmask of a ucsp placement: time indices t1 to t2 (inclusive) on days.'''
+	return occupancy(UCSP_SLOT_START[t1], UCSP_SLOT_END[t2], days)
+
+
+def overlaps(mask:int, other_mask:int)->True or False:
+	'''Check whether two placements share at least one half-hour on the same day.'''
+	return (mask & other_mask) != 0
+
+
+def to_grid(mask:int)->np.array:
+	'''Unpack a bitmask into a (32, 5) 0/1 array of half-hours x days.'''
+	grid = np.zeros((N_HALF_HOURS, N_DAYS), dtype=int)
+	for day in range(N_DAYS):
+		bits = (mask >> (day*N_HALF_HOURS)) & ((1 << N_HALF_HOURS) - 1)
+		for t in range(N_HALF_HOURS):
+			grid[t, day] = (bits >> t) & 1
+	return grid
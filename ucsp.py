@@ -5,7 +5,10 @@
 # Description : Course scheduling problem implementation.
 
 import numpy as np
-import typing, csv
+import typing
+import collections, functools
+import timegrid, coursedata
+from conflictgraph import ConflictGraph, HARD, SOFT
 
 # We have two types of timeslots: hour and 1.5-hour.
 # A course consists of one or more indices [i:j] into this schedule
@@ -53,46 +56,46 @@ import typing, csv
 class Course:
 
 	@staticmethod
-	def init_random(meetingLength, nMeetings, *args):
+	def init_random(meetingLength, nMeetings, *args, rng:np.random.Generator=None):
 		'''Initialize a course "randomly" within constraints.
  Guaranteed to produce a feasible sample: e.g. one within acceptable time range
  and with acceptable days (MW, not MTu, etc.).
+ rng: the numpy.random.Generator to draw from (default: a new, unseeded one).
 '''
-		time_range  = [0,]
-		base_length = 0.0
+		# Number of hour or 1.5 hour slots the course needs. A course which doesn't fill
+		# its last slot (e.g. 1.25 hours) still occupies all of it.
+		n_slots = [int(np.ceil(meetingLength/1.0)), int(np.ceil(meetingLength/1.5))]
 
 		# These two ranges are to select from hour timeslots (0 - 11) or 1.5 hour (11 - 18).
-		time_ranges = [range(0, 11 - int(meetingLength/1.0-1)), \
-		               range(11,18 - int(meetingLength/1.5-1))]
+		time_ranges = [range(0, 11 - (n_slots[0]-1)), \
+		               range(11,18 - (n_slots[1]-1))]
+
+		rng = np.random.default_rng(rng)
 
 		# If length is ambiguous - ex. could be 2x 1.5 or 3x 1.0
 		if (0.0 == meetingLength % 1.5) and (0.0 == meetingLength % 1.0):
 			# Pick randomly
-			idx = np.random.choice([0, 1])
-			time_range = time_ranges[idx]
-			base_length = [1.0, 1.5][idx]
+			idx = rng.choice([0, 1])
 
 		# The meetingLength is only a multiple of 1.0
 		elif (0.0 == meetingLength % 1.0):
-			time_range = time_ranges[0]
-			base_length = 1.0
+			idx = 0
 		
 		# The meetingLength is only a multiple of 1.5
 		else:
-			time_range = time_ranges[1]
-			base_length = 1.5
+			idx = 1
 
 		# Choose the class start time randomly from the valid range
-		t1 = np.random.choice(time_range)
+		t1 = rng.choice(time_ranges[idx])
 		# Choose the end time using the length of the meeting
-		t2 = t1 + meetingLength/base_length - 1
+		t2 = t1 + n_slots[idx] - 1
 
 		# Set up the days
 		d = np.zeros(5, dtype=int)
 		if 1 == nMeetings:
-			d[np.random.choice(range(0,5))] = 1
+			d[rng.choice(range(0,5))] = 1
 		elif 2 == nMeetings:
-			idx = np.random.choice(range(0,3))
+			idx = rng.choice(range(0,3))
 			d[idx] = 1; d[idx + 2] = 1
 		elif 3 == nMeetings:
 			d = np.array([1,0,1,0,1], dtype=int)
@@ -123,6 +126,9 @@ class Course:
 	[" 6:00p","7:30p",],
 	]
 	DAY_NAMES = ["M", "Tu", "W", "Th", "F"]
+	# The Ucsp this course's td is a row of (and which row), if any
+	owner = None
+	index = None
 	N_HOUR_SLOTS = 11
 	N_80MIN_SLOTS = 7
 
@@ -141,26 +147,46 @@ shouldntOverlap: same as cantOverlap but for soft overlap constraint (not hard).
 '''
 		self.courseName      = courseName
 		self.numberEnrolled  = numberEnrolled
-		self.cantOverlap     = [] if cantOverlap == "" else [int(idx)-1 for idx in cantOverlap.split(";") if idx != '']
-		self.shouldntOverlap = [] if shouldntOverlap == "" else [int(idx)-1 for idx in shouldntOverlap.split(";") if idx != '']
+		self.cantOverlap     = self.parse_indices(cantOverlap)
+		self.shouldntOverlap = self.parse_indices(shouldntOverlap)
 		self.td = np.hstack([new_t, new_d])
 
-		if new_t[0] < self.N_HOUR_SLOTS: # t is in the 1.0 hour slots
-			self.t_range = range(0, self.N_HOUR_SLOTS - (self.td[1] - self.td[0]))
-		else:
-			self.t_range = range(self.N_HOUR_SLOTS, self.N_80MIN_SLOTS - (self.td[1] - self.td[0]))
+		t_min, t_max = self.start_range(self.td)
+		self.t_range = range(t_min, t_max + 1)
+
+	@classmethod
+	def start_range(cls, td:np.array)->(np.array, np.array):
+		'''First and last start times which keep a course placed at td (a [t1, t2, ...] row,
+or an (N, 7) array of them) inside its kind of slot. td[1] is its last slot, so the
+range depends on the course's length and kind of slot, which differ between placements
+of a 3 hour course (3 x 1 hour or 2 x 1.5 hours).'''
+		is_hour = td[...,0] < cls.N_HOUR_SLOTS
+		length  = td[...,1] - td[...,0]
+		t_min = np.where(is_hour, 0, cls.N_HOUR_SLOTS)
+		t_max = np.where(is_hour, cls.N_HOUR_SLOTS, cls.N_HOUR_SLOTS + cls.N_80MIN_SLOTS) - 1 - length
+		return t_min, t_max
+
 
 
+	@staticmethod
+	def parse_indices(indices)->[int]:
+		'''Convert a string of 1-based overlap indices such as "5;6" to a list
+of 0-based indices. A list (already 0-based, e.g. from a Ucsp) is passed through.
+'''
+		if not isinstance(indices, str):
+			return [int(idx) for idx in indices]
+		return [int(idx)-1 for idx in indices.split(";") if idx != '']
+
 
 	def is_valid(self, t):
 		'''Check if a course has a valid time range.
 Example: if the valid times are 8am - 7pm and the course is at 8pm, is_valid returns False.
 Does not check for overlaps.
 '''
-		return self.td[0] + t in self.t_range and self.td[1] + t in self.t_range
+		return self.td[0] + t in self.t_range
 
 
-	def perturb(self, d=0, t=0):
+	def perturb(self, d=0, t=0, rng:np.random.Generator=None):
 		'''Perturb this course.
 If d != 0, attempt to perturb the course days.
 (This won't have any effect if the course is 3 days per week, since
@@ -168,7 +194,10 @@ the only option for those courses is MWF.
 If t != 0, attempt to perturb the course time.
 This won't push the course time outside the allowable range.
 (e.g. if the last allowable time is 7pm, t=1 won't push it to 8pm.)
+rng: the numpy.random.Generator used to pick new days.
+If this course is a view of a Ucsp row, the Ucsp's hash is updated too.
 '''
+		old = self.td.copy()
 		if t != 0:
 			
 			if self.is_valid(t):
@@ -176,23 +205,43 @@ This won't push the course time outside the allowable range.
 				
 				
 		if d != 0:
-			n_days = sum(self.td[2:])
-			if n_days == 1:
-				self.td[2:] = np.zeros(5, dtype=int)
-				self.td[2+np.random.choice(range(0,5))] = 1
-			if n_days == 2:
-				choices = np.array([[1,0,1,0,0],[0,1,0,1,0],
-					      [0,1,0,1,0], [0,0,1,0,1]], dtype=int)
-				self.td[2:] = choices[np.random.choice(range(0,4))]
-			
+			self.td[2:] = self.random_days(self.td[2:], rng)
+
+		if self.owner is not None:
+			self.owner.update_hash(self.index, old)
 
-	def make_feasible(self, schedule):
+
+	@staticmethod
+	def random_days(d:np.array, rng:np.random.Generator=None)->np.array:
+		'''Return a random day pattern with as many days as d, drawn from rng.
+3 day courses are always MWF, so d is returned unchanged for those.
+'''
+		rng = np.random.default_rng(rng)
+		n_days = sum(d)
+		if n_days == 1:
+			d = np.zeros(5, dtype=int)
+			d[rng.choice(range(0,5))] = 1
+		if n_days == 2:
+			d = Course.TWO_DAY_PATTERNS[rng.choice(range(0,4))]
+		return d
+
+	# Day patterns for 2 day courses (TuTh is listed twice)
+	TWO_DAY_PATTERNS = np.array([[1,0,1,0,0],[0,1,0,1,0],
+		                         [0,1,0,1,0], [0,0,1,0,1]], dtype=int)
+	# Every allowed day pattern, by number of days per week
+	DAY_PATTERNS = {1: np.eye(5, dtype=int),
+	                2: np.unique(TWO_DAY_PATTERNS, axis=0),
+	                3: np.array([[1,0,1,0,1]], dtype=int)}
+
+	def make_feasible(self, schedule, rng:np.random.Generator=None):
 		'''Attempt to make the placement of this course within a schedule
 (list of other courses) feasible. If we find an overlap,
 we try to fix it by randomly perturbing one of the overlapping classes.
 This method can silently fail to make the schedule feasible.
 You should check_feasible() after running it..
+rng: the numpy.random.Generator for the perturbations.
 '''
+		rng = np.random.default_rng(rng)
 		# No overlap constraints on this 
 		if self.cantOverlap == []:
 			return
@@ -205,7 +254,7 @@ You should check_feasible() after running it..
 			
 			while is_conflict and i < 10:
 				
-				self.perturb(np.random.choice([-1, 1]), np.random.choice([-1.1]))
+				self.perturb(rng.choice([-1, 1]), rng.choice([-1.1]), rng)
 				i += 1
 
 
@@ -213,28 +262,19 @@ You should check_feasible() after running it..
 		'''Check whether another course conflicts with self.
 To conflict means otherCourse has at least overlapping day AND time.
 '''
-		t1, t2 = self.td[0], self.td[1]
-		o1, o2 = otherCourse.td[0], otherCourse.td[1]
-		
-		if max(self.td[2:] + otherCourse.td[2:]) > 1: # days overlap
+		return Course.td_conflict(self.td, otherCourse.td)
 
-			if t1 >= self.N_HOUR_SLOTS: # it's an 80min slot
-				# remap it
-				t1, t2 = self.CONFLICT_MAP[t1][0], self.CONFLICT_MAP[t2][1]
-			
-			if o1 >= self.N_HOUR_SLOTS: # it's an 80min slot
-				# remap it
-				o1, o2 = self.CONFLICT_MAP[o1][0], self.CONFLICT_MAP[o2][1]
-
-			# now check for conflicts
-			# Conflict doesn't occur if:
-			#      t1[   ]t2     t1 - o2 >= 0.0
-			# o1[   ]o2      or: t2 - o1 >= 0.0
-			# 
-			if not (o1 - t2 >= 0 or t1 - o2 >= 0):
-				return True
-		# No conflicts found
-		return False
+	def occupancy(self)->int:
+		'''This course's half-hour occupancy bitmask (see timegrid.py).'''
+		return timegrid.ucsp_occupancy(self.td[0], self.td[1], self.td[2:])
+
+	@staticmethod
+	def td_conflict(td:np.array, other_td:np.array)->True or False:
+		'''Check whether two course placements (rows [t1, t2, d...]) conflict,
+e.g. share a half-hour on the same day (see timegrid.overlaps).
+This is a lookup in the precomputed TIME_CONFLICT and DAY_CONFLICT tables.'''
+		return TIME_CONFLICT[td[0], td[1], other_td[0], other_td[1]] and \
+		       DAY_CONFLICT[td[2:] @ DAY_BITS, other_td[2:] @ DAY_BITS]
 
 	# Make print(course) output a nice human-readable string.
 	def __str__(self) ->str:
@@ -245,31 +285,311 @@ To conflict means otherCourse has at least overlapping day AND time.
 			   self.TIME_NAMES[self.td[0]][0], self.TIME_NAMES[self.td[1]][1]   \
 			   )
 
-	# Map conflicts from 1.5 hour indices (11 - 17) to 1 hour indices (0 - 10)
-	CONFLICT_MAP = {
-	11:[0,1],
-	12:[1,2],
-	13:[3,4],
-	14:[4,5],
-	15:[6,7],
-	16:[7,8],
-	17:[9,10],
-	}
+	@staticmethod
+	def td_conflicts(td:np.array, other_td:np.array)->np.array:
+		'''Vectorized td_conflict: compare placements row by row with one gather per table.
+td and other_td are (..., 7) arrays of the same (or broadcastable) shape;
+returns a boolean (...) array.
+'''
+		return TIME_CONFLICT[td[...,0], td[...,1], other_td[...,0], other_td[...,1]] & \
+		       DAY_CONFLICT[td[...,2:] @ DAY_BITS, other_td[...,2:] @ DAY_BITS]
+
 
 
+def build_conflict_tables()->(np.array, np.array):
+	'''Precompute the answer to every pairwise conflict check.
+There are only 18 time indices and 32 day masks, so this is cheap to do once.
+Returns TIME_CONFLICT, where [t1, t2, o1, o2] is True if time blocks t1-t2 and o1-o2 overlap,
+and DAY_CONFLICT, where [a, b] is True if day bitmasks a and b (see DAY_BITS) share a day.
+Both are built from the half-hour occupancy encoding in timegrid.py.
+'''
+	n = len(Course.TIME_NAMES)
+	blocks = np.array([[timegrid.time_bits(timegrid.UCSP_SLOT_START[t1], timegrid.UCSP_SLOT_END[t2])
+	                    for t2 in range(n)] for t1 in range(n)], dtype=np.int64)
+	time_table = (blocks[:,:,None,None] & blocks[None,None,:,:]) != 0
+
+	codes = np.arange(2**5)
+	day_table = (codes[:,None] & codes[None,:]) != 0
+	return time_table, day_table
+
+# Day mask [M, Tu, W, Th, F] -> bitmask, e.g. d @ DAY_BITS
+DAY_BITS = 2**np.arange(5)
+TIME_CONFLICT, DAY_CONFLICT = build_conflict_tables()
+
+
+# Zobrist hashing of schedules: every (course, start time), (course, end time) and
+# (course, day mask) gets a random 64 bit key, and a schedule's hash is the XOR of
+# the keys of its placements. Moving a course XORs its old keys out and its new keys in.
+# The keys only depend on the number of courses, so schedules of the same courses
+# built separately (e.g. the samples of a swarm) hash alike.
+ZOBRIST_SEED = 222
+
+@functools.lru_cache(maxsize=8)
+def zobrist_keys(n:int)->(np.array, np.array, np.array):
+	'''The (n, 18) start time, (n, 18) end time and (n, 32) day mask keys for n courses.'''
+	rng = np.random.default_rng(ZOBRIST_SEED)
+	n_times = len(Course.TIME_NAMES)
+	keys = [rng.integers(0, 2**64, (n, size), dtype=np.uint64, endpoint=False) for size in [n_times, n_times, 2**5]]
+	for k in keys:
+		k.flags.writeable = False # shared by every schedule with n courses
+	return tuple(keys)
+
+
+class PenaltyCache:
+	'''Least-recently-used cache of schedule penalties, keyed by schedule hash (see Ucsp.zhash).
+One cache can be shared by every sample of a swarm.
+The penalty weights are not part of the key, so clear() the cache after changing them.
+'''
+	def __init__(self, capacity:int=4096):
+		self.capacity = capacity
+		self.entries  = collections.OrderedDict()
+		self.hits     = 0
+		self.misses   = 0
+
+	def __len__(self)->int:
+		return len(self.entries)
+
+	def get(self, key:int)->float:
+		'''Return the penalty stored under key, or None.'''
+		penalty = self.entries.get(key)
+		if penalty is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.entries.move_to_end(key)
+		return penalty
+
+	def put(self, key:int, penalty:float):
+		'''Store a penalty, evicting the least recently used one if the cache is full.'''
+		self.entries[key] = penalty
+		self.entries.move_to_end(key)
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+
+	def clear(self):
+		self.entries.clear()
+		self.hits, self.misses = 0, 0
+
+
+# Which implementation Ucsp's penalty and hard constraint checks use:
+# "numpy" (vectorized), or "numba" (compiled loops in ucsp_jit.py).
+BACKEND = "numpy"
+_jit = None # the ucsp_jit module, when BACKEND is "numba"
+
+def set_backend(name:str="auto")->str:
+	'''Switch the penalty and hard constraint backend. name is "numpy", "numba",
+or "auto", which picks numba if it is installed and otherwise falls back to NumPy.
+Returns the backend in use. Raises ImportError for "numba" if numba isn't installed.'''
+	global BACKEND, _jit
+	if name not in ["auto", "numpy", "numba"]:
+		raise ValueError("Unknown backend {}".format(name))
+	_jit = None
+	if name != "numpy":
+		import ucsp_jit
+		if ucsp_jit.HAVE_NUMBA:
+			_jit = ucsp_jit
+		elif name == "numba":
+			raise ImportError("The numba backend needs numba to be installed")
+	BACKEND = "numpy" if _jit is None else "numba"
+	return BACKEND
+
+
+def csr_indices(lists:[[int]])->(np.array, np.array):
+	'''Compress a list of index lists into CSR arrays (ptr, idx).
+The entries for row i are idx[ptr[i]:ptr[i+1]].
+'''
+	ptr = np.zeros(len(lists) + 1, dtype=int)
+	ptr[1:] = np.cumsum([len(l) for l in lists])
+	idx = np.array([j for l in lists for j in l], dtype=int)
+	return ptr, idx
+
 
 # The UCSP consists of a list of Courses which make up a Schedule.
 # It has methods to check whether the Schedule is feasible
 # and to perturb the courses in the hopes of making an infeasible Schedule feasible.
+# The schedule is stored column-wise: one (N, 7) array of [t1, t2, M, Tu, W, Th, F] rows
+# and the constraint graph (conflictgraph.py) of the hard (cantOverlap) and soft (shouldntOverlap) constraints.
+# Course objects are only created as views, e.g. for printing.
 class Ucsp:
 	# Define what counts as non-business hours.
 	ODD_HOURS_INDICES = [8, 9, 10, 17]
 	LUNCH_HOUR_1_0    = 3
 	LUNCH_HOUR_1_5    = 13
+	# ADJUST THE PENALTY WEIGHTS HERE
+	SOFT_OVERLAP_WEIGHT = 10.0
+	SPREADING_WEIGHT    = 1.0
+	ODD_HOURS_WEIGHT    = 2.0
+	LUNCH_HOURS_WEIGHT  = 1.0
+	# Keyword names of the weights, for weights() and set_weights()
+	WEIGHT_NAMES = {"soft_overlap": "SOFT_OVERLAP_WEIGHT", "spreading": "SPREADING_WEIGHT",
+	                "odd_hours": "ODD_HOURS_WEIGHT", "lunch_hours": "LUNCH_HOURS_WEIGHT"}
+
+	@classmethod
+	def weights(cls)->dict:
+		'''The penalty weights, e.g. {"soft_overlap": 10.0, ...}.'''
+		return {name: getattr(cls, attr) for name, attr in cls.WEIGHT_NAMES.items()}
+
+	@classmethod
+	def set_weights(cls, **weights):
+		'''Change penalty weights for every schedule, e.g. Ucsp.set_weights(odd_hours=5).
+Weights given as None are left alone.'''
+		for name, value in weights.items():
+			if name not in cls.WEIGHT_NAMES:
+				raise ValueError("Unknown penalty weight {}".format(name))
+			if value is not None:
+				setattr(cls, cls.WEIGHT_NAMES[name], float(value))
+
+	def __init__(self, schedule:[Course], rng:np.random.Generator=None):
+		'''Initialize a new problem from a list of Courses.
+The course placements are copied into the columnar store and each Course's td
+is replaced with a view of its row, so perturbing a Course still updates the schedule.
+rng: this schedule's own numpy.random.Generator (or a seed for one), used by every
+random perturbation of it. Default: a new, unseeded Generator.
+'''
+		self.rng = np.random.default_rng(rng)
+
+		# Dynamic state: one row per course
+		self.td = np.empty((len(schedule), 7), dtype=int)
+		for i, course in enumerate(schedule):
+			self.td[i] = course.td
+			course.td  = self.td[i]
+			course.owner, course.index = self, i
+		# Lengths and start ranges of the courses as placed (copies with other placements recompute them)
+		self.slot_ranges()
+
+		# Static data: never written to, so it is shared by copies of this schedule
+		self.names    = [course.courseName for course in schedule]
+		self.enrolled = np.array([course.numberEnrolled for course in schedule], dtype=int)
+		# A course overlapping itself doesn't count (as in compute_penalty.py): the data has
+		# a few courses listed in their own cantOverlap group, which no schedule could satisfy.
+		self.hard_ptr, self.hard_idx = csr_indices([[j for j in course.cantOverlap if j != i]
+		                                            for i, course in enumerate(schedule)])
+		self.soft_ptr, self.soft_idx = csr_indices([course.shouldntOverlap for course in schedule])
+		# The constraint graph: each listed pair once (i < j) per kind, weighted by how often it is listed.
+		# Its (src, dst) edge arrays evaluate all constraints at once; the neighbours of each
+		# course in either direction give the terms involving it, for penalty_delta.
+		self.graph = ConflictGraph.from_csr(len(schedule), (self.hard_ptr, self.hard_idx), (self.soft_ptr, self.soft_idx))
+		self.hard_src, self.hard_dst, self.hard_weight = self.graph.edges(HARD)
+		self.soft_src, self.soft_dst, self.soft_weight = self.graph.edges(SOFT)
+		self.hard_nbr_ptr, self.hard_nbr_idx, self.hard_nbr_weight = self.graph.csr(HARD)
+		self.soft_nbr_ptr, self.soft_nbr_idx, self.soft_nbr_weight = self.graph.csr(SOFT)
+
+		# Move journal: rows of [course index, old placement] so moves can be undone.
+		self.journal     = np.empty((16, 8), dtype=int)
+		self.journal_len = 0
+
+		# Zobrist hash of the placements, kept up to date by every method which moves courses
+		self.zobrist_t1, self.zobrist_t2, self.zobrist_d = zobrist_keys(len(schedule))
+		self.rehash()
+		self.cache = None # optional PenaltyCache used by check_desirable
+
+	def slot_ranges(self):
+		'''Set each course's length and first and last start times (see Course.start_range)
+from its placement. Moves never change them, but they are per schedule: a 3 hour course can
+be placed in 1 hour or 1.5 hour slots.'''
+		self.length = self.td[:,1] - self.td[:,0]
+		self.t_min, self.t_max = Course.start_range(self.td)
+
+	@classmethod
+	def init_random(cls, data, rng:np.random.Generator=None)->"Ucsp":
+		'''A random schedule of the courses in data (a coursedata.CourseData),
+each placed with Course.init_random. rng becomes the schedule's random stream.'''
+		rng = np.random.default_rng(rng)
+		return cls.from_placements(data, cls.random_placements(data, rng), rng)
 
-	def __init__(self, schedule:[Course]):
-		'''Initialize a new problem'''
-		self.schedule = schedule
+	@staticmethod
+	def random_placements(data, rng:np.random.Generator=None)->np.array:
+		'''(N, 7) random placements of the courses in data, drawn as init_random draws them.
+With a template schedule of the same data, template.copy(random_placements(data, rng), rng)
+gives the same schedule as init_random(data, rng), without its own copy of the static data.'''
+		rng = np.random.default_rng(rng)
+		td = np.empty((len(data), 7), dtype=int)
+		for i in range(len(data)):
+			td[i] = Course.init_random(data.meeting_length[i], data.n_meetings[i], data.course_names[i],
+			                           data.enrolled[i], [], [], rng=rng).td
+		return td
+
+	@classmethod
+	def from_placements(cls, data, td:np.array, rng:np.random.Generator=None)->"Ucsp":
+		'''The schedule of the courses in data (a coursedata.CourseData) at placements td,
+an (N, 7) array of [t1, t2, M, Tu, W, Th, F] rows, e.g. saved from another schedule.'''
+		return cls([Course(td[i,0:2], td[i,2:], data.course_names[i], data.enrolled[i], data.hard(i), data.soft(i))
+		            for i in range(len(data))], rng)
+
+	def __len__(self)->int:
+		return len(self.td)
+
+	@property
+	def t(self)->np.array:
+		'''(N, 2) view of the start and end time indices.'''
+		return self.td[:, 0:2]
+
+	@property
+	def d(self)->np.array:
+		'''(N, 5) view of the day masks.'''
+		return self.td[:, 2:]
+
+	@property
+	def schedule(self)->[Course]:
+		'''The schedule as a list of Course views.'''
+		return [self.course(i) for i in range(len(self))]
+
+	def course(self, i:int)->Course:
+		'''Return a lightweight Course view of row i.
+Perturbing the view moves course i in this schedule.
+'''
+		course = Course(self.td[i, 0:2], self.td[i, 2:], self.names[i], self.enrolled[i],
+		                self.hard_idx[self.hard_ptr[i]:self.hard_ptr[i+1]],
+		                self.soft_idx[self.soft_ptr[i]:self.soft_ptr[i+1]])
+		course.td = self.td[i]
+		course.owner, course.index = self, i
+		return course
+
+	def copy(self, td:np.array=None, rng:np.random.Generator=None)->"Ucsp":
+		'''Copy the schedule state. The static course data is shared, not copied.
+The copy shares this schedule's penalty cache, and gets its own copy of the particle
+state (v, x_best), if any.
+td: placements for the copy instead of this schedule's. The copy keeps this (N, 7) int array
+as its td, so it can be e.g. a row of a memory-mapped population, and gets its own course
+lengths and start ranges from it (see slot_ranges).
+rng: random stream of the copy (default: one spawned from this schedule's, independent of it).'''
+		other = object.__new__(Ucsp)
+		other.__dict__.update(self.__dict__)
+		if td is None:
+			other.td = self.td.copy()
+		else:
+			other.td = td
+			other.slot_ranges()
+			other.rehash()
+		other.rng = self.rng.spawn(1)[0] if rng is None else np.random.default_rng(rng)
+		for name in ["v", "x_best"]:
+			if getattr(self, name, None) is not None:
+				setattr(other, name, np.copy(getattr(self, name)))
+		other.journal     = np.empty_like(self.journal)
+		other.journal_len = 0
+		return other
+
+	def placement_hash(self, idx, rows:np.array)->int:
+		'''XOR of the Zobrist keys of courses idx placed at rows (an index and a row,
+or an array of indices and the matching (K, 7) rows).'''
+		keys = self.zobrist_t1[idx, rows[...,0]] ^ self.zobrist_t2[idx, rows[...,1]] ^ \
+		       self.zobrist_d[idx, rows[...,2:] @ DAY_BITS]
+		return int(np.bitwise_xor.reduce(np.atleast_1d(keys)))
+
+	def rehash(self):
+		'''Recompute the schedule hash from scratch. Only needed after writing to td directly.'''
+		self.zhash = self.placement_hash(np.arange(len(self)), self.td)
+
+	def update_hash(self, idx, old_rows:np.array):
+		'''Update the hash after courses idx moved from old_rows to their current rows.
+Costs O(1) per course moved.'''
+		self.zhash ^= self.placement_hash(idx, old_rows) ^ self.placement_hash(idx, self.td[idx])
+
+	def place(self, i:int, row:np.array):
+		'''Put course i at placement row (without journaling it, unlike move).'''
+		old = self.td[i].copy()
+		self.td[i] = row
+		self.update_hash(i, old)
 
 	def add_overlap_constraint(self, c1, c2, enforce=True):
 		'''Add a constraint that courses c1 and c2 cannot overlap/
@@ -279,71 +599,352 @@ class Ucsp:
 		are commonly taken together and SHOULDN'T overlap'''
 		pass
 
+	def is_valid(self, i, t)->True or False:
+		'''Check if moving course i by t keeps it in its valid time range (see Course.is_valid).
+i and t may also be arrays (or i a slice), in which case a boolean array is returned.'''
+		t1 = self.td[i,0] + t
+		return (self.t_min[i] <= t1) & (t1 <= self.t_max[i]) & (t == np.floor(t))
+
+	def perturb(self, i:int, d=0, t=0):
+		'''Perturb course i in place (see Course.perturb).'''
+		old = self.td[i].copy()
+		if t != 0:
+			if self.is_valid(i, t):
+				self.td[i,0:2] += t
+
+		if d != 0:
+			self.td[i,2:] = Course.random_days(self.td[i,2:], self.rng)
+		self.update_hash(i, old)
+
+	def randomize_days(self, idx:np.array):
+		'''Vectorized day perturbation: give every course in idx a random day pattern
+with the same number of days (see Course.random_days).'''
+		old = self.td[idx].copy()
+		n_days = np.sum(self.td[idx,2:], axis=1)
+		one, two = idx[n_days == 1], idx[n_days == 2]
+		self.td[one,2:] = np.eye(5, dtype=int)[self.rng.integers(0, 5, len(one))]
+		self.td[two,2:] = Course.TWO_DAY_PATTERNS[self.rng.integers(0, 4, len(two))]
+		self.update_hash(idx, old)
+
+	def check_conflict(self, i:int, j:int)->True or False:
+		'''Check whether courses i and j conflict.'''
+		return Course.td_conflict(self.td[i], self.td[j])
+
+	def count_violations(self)->np.array:
+		'''Conflict table of the hard constraints: entry e is 1 if the courses of hard edge e,
+hard_src[e] and hard_dst[e], overlap, else 0.
+Evaluated for every edge at once, and doesn't change the schedule.'''
+		return Course.td_conflicts(self.td[self.hard_src], self.td[self.hard_dst]).astype(int)
+
+	def hard_violations(self)->int:
+		'''Count the violated hard constraints (cantOverlap entries, so an edge counts
+as often as it is listed). Doesn't change the schedule.'''
+		if _jit is not None:
+			return _jit.weighted_conflicts(self.td, self.hard_src, self.hard_dst, self.hard_weight,
+			                               TIME_CONFLICT, DAY_CONFLICT)
+		return int(self.count_violations() @ self.hard_weight)
+
 	def check_feasible(self)->True or False:
-		'''Check whether a schedule is feasible (all hard constraints met)'''
-		for course in self.schedule:
-			for idx in course.cantOverlap:
-				i=0
-				is_conflict = course.check_conflict(self.schedule[idx])
-				
-				# Try to make feasible
-				while is_conflict and i < 10:
-					course.perturb(np.random.choice([-1,1]), np.random.choice([-1,1]))
-					is_conflict = course.check_conflict(self.schedule[idx])
-					i += 1
-				if is_conflict:
-					return False
+		'''Check whether a schedule is feasible (all hard constraints met).
+Doesn't change the schedule; see repair() to fix an infeasible one.'''
+		return self.hard_violations() == 0
+
+	def repair(self, max_moves:int=None)->True or False:
+		'''Try to remove the hard constraint violations by moving only courses on violated edges.
+Each move picks a random violated edge from the conflict table (see count_violations)
+and moves one of its two courses, at random, to a placement with the fewest conflicts
+with its hard neighbours. Gives up after max_moves moves (default: 10 per course).
+Returns whether the schedule is feasible.
+'''
+		if max_moves is None:
+			max_moves = 10*len(self)
+		for k in range(max_moves):
+			violated = np.flatnonzero(self.count_violations())
+			if len(violated) == 0:
+				return True
+			e = self.rng.choice(violated)
+			i = self.rng.choice([self.hard_src[e], self.hard_dst[e]])
+			self.place(i, self.least_conflicting(i, self.hard_nbr_idx[self.hard_nbr_ptr[i]:self.hard_nbr_ptr[i+1]]))
+		return self.check_feasible()
+
+	def construct_feasible(self, max_restarts:int=10)->True or False:
+		'''Re-place every course so that no hard constraint is violated, by greedy colouring
+of the cantOverlap graph. Courses are placed in order of decreasing hard degree (random
+tie-break), each at a random placement which doesn't conflict with its already placed
+neighbours. Course lengths and numbers of days are kept.
+If some course has no such placement, the attempt stops there and restarts with a new
+random order, up to max_restarts times. Greedy colouring can fail on very dense constraint graphs,
+so this returns whether the schedule ended up feasible.
+'''
+		degree = np.diff(self.hard_nbr_ptr)
+		for attempt in range(max_restarts):
+			order = np.lexsort((self.rng.random(len(self)), -degree))
+			placed = np.zeros(len(self), dtype=bool)
+			for i in order:
+				neighbours = self.hard_nbr_idx[self.hard_nbr_ptr[i]:self.hard_nbr_ptr[i+1]]
+				neighbours = neighbours[placed[neighbours]]
+				self.place(i, self.least_conflicting(i, neighbours))
+				placed[i] = True
+				if np.any(Course.td_conflicts(self.td[i][None], self.td[neighbours])):
+					break # placed neighbours don't move again, so this attempt can't succeed
+			else:
+				return True
+		return False
 
-		# None found
-		return True
+	def least_conflicting(self, i:int, neighbours:np.array)->np.array:
+		'''Return a placement of course i (see placements) which overlaps the fewest
+of the given courses, chosen at random among the ties.'''
+		candidates = self.placements(i)
+		n_conflicts = np.count_nonzero(Course.td_conflicts(candidates[:,None], self.td[None,neighbours]), axis=1)
+		return candidates[self.rng.choice(np.flatnonzero(n_conflicts == np.min(n_conflicts)))]
+
+	def placements(self, i:int)->np.array:
+		'''Every allowed (C, 7) placement of course i: each start time in its kind of slot,
+with each day pattern with its number of days.'''
+		starts = np.arange(self.t_min[i], self.t_max[i] + 1)
+		patterns = Course.DAY_PATTERNS.get(np.sum(self.td[i,2:]), self.td[i,2:][None])
+		candidates = np.empty((len(starts), len(patterns), 7), dtype=int)
+		candidates[:,:,0] = starts[:,None]
+		candidates[:,:,1] = starts[:,None] + self.length[i]
+		candidates[:,:,2:] = patterns[None]
+		return candidates.reshape(-1, 7)
 
 	def check_desirable(self)->float:
-		'''Compute a measure of schedule goodness: count soft constraints met.'''
+		'''Compute a measure of schedule goodness: count soft constraints met.
+All courses and soft constraint edges are evaluated at once with NumPy.
+If the schedule has a PenaltyCache, a schedule seen before is looked up by its hash instead.
+'''
+		if self.cache is None:
+			return self.penalties(self.td)
+		penalty = self.cache.get(self.zhash)
+		if penalty is None:
+			penalty = self.penalties(self.td)
+			self.cache.put(self.zhash, penalty)
+		return penalty
+
+	def check_desirable_many(self, samples:["Ucsp"], batch_size:int=1024)->np.array:
+		'''check_desirable for a list of schedules of these courses, e.g. a swarm.
+The ones missing from this schedule's cache are scored in batches of batch_size,
+so a very large swarm never needs all its placements stacked in memory at once.'''
+		if self.cache is None:
+			misses = list(range(len(samples)))
+			y = np.empty(len(samples))
+		else:
+			cached = [self.cache.get(sample.zhash) for sample in samples]
+			misses = [k for k, penalty in enumerate(cached) if penalty is None]
+			y = np.array([np.nan if penalty is None else penalty for penalty in cached])
+		for start in range(0, len(misses), batch_size):
+			batch = misses[start:start + batch_size]
+			y[batch] = self.penalties(np.stack([samples[k].td for k in batch]))
+		if self.cache is not None:
+			for k in misses:
+				self.cache.put(samples[k].zhash, y[k])
+		return y
+
+	def check_desirable_batch(self, t:np.array, d:np.array, length:np.array=None)->np.array:
+		'''Compute check_desirable for a whole population of schedules of these courses.
+t: (P, N) start time indices.
+d: (P, N, 5) day masks.
+length: (N,) or (P, N) end minus start time indices. Defaults to this schedule's.
+(Courses whose length can be split into 1.0 or 1.5 hour slots may differ between samples.)
+Returns a (P,) array of penalties.
+'''
+		td = np.empty(np.shape(t) + (7,), dtype=int)
+		td[...,0] = t
+		td[...,1] = t + (self.length if length is None else length)
+		td[...,2:] = d
+		return self.penalties(td)
+
+	def penalty_at(self, x:np.array)->float:
+		'''Objective for particleswarm.ParticleSwarm: the penalty of this schedule if the
+course start times were x, rounded and clipped to each course's allowed range.
+The days are left as they are. x may also be a (P, N) population, giving P penalties.
+'''
+		t = np.clip(np.rint(x).astype(int), self.t_min, self.t_max)
+		return self.check_desirable_batch(t, np.broadcast_to(self.d, np.shape(t) + (5,)))
+
+	def jit_args(self)->tuple:
+		'''Masks, weights and tables passed to the ucsp_jit kernels.
+Cached, and rebuilt if the penalty settings change.'''
+		weights = (self.SOFT_OVERLAP_WEIGHT, self.SPREADING_WEIGHT, self.ODD_HOURS_WEIGHT, self.LUNCH_HOURS_WEIGHT)
+		key = (weights, tuple(self.ODD_HOURS_INDICES), self.LUNCH_HOUR_1_0, self.LUNCH_HOUR_1_5)
+		if self.__dict__.get("_jit_key") != key:
+			t = np.arange(len(Course.TIME_NAMES))
+			odd   = np.isin(t, self.ODD_HOURS_INDICES)
+			lunch = (t == self.LUNCH_HOUR_1_0) | (t == self.LUNCH_HOUR_1_5)
+			self._jit_key, self._jit_args = key, (odd, lunch, np.array(weights, dtype=float), TIME_CONFLICT, DAY_CONFLICT)
+		return self._jit_args
+
+	def penalties(self, td:np.array)->np.array:
+		'''Penalty of one or more schedules given as (..., N, 7) placement arrays.'''
+		if _jit is not None:
+			td = np.ascontiguousarray(td, dtype=np.int64)
+			if td.ndim == 2:
+				return _jit.penalty(td, self.soft_src, self.soft_dst, self.soft_weight, *self.jit_args())
+			batch = td.reshape((-1,) + td.shape[-2:])
+			return _jit.penalty_batch(batch, self.soft_src, self.soft_dst, self.soft_weight,
+			                          *self.jit_args()).reshape(td.shape[:-2])
+
+		t1, t2 = td[...,0], td[...,1]
+		# Check for odd (non-business) hours
+		oddHoursPenalty = np.count_nonzero(np.isin(t1, self.ODD_HOURS_INDICES) | \
+		                                   np.isin(t2, self.ODD_HOURS_INDICES), axis=-1)
+		# Check for soft overlap constraint
+		softOverlapPenalty = Course.td_conflicts(td[...,self.soft_src,:], td[...,self.soft_dst,:]) @ self.soft_weight
+		# Penalize courses at lunchtime
+		lunchHoursPenalty = np.count_nonzero((t1 == self.LUNCH_HOUR_1_0) | (t1 == self.LUNCH_HOUR_1_5), axis=-1)
+
+		# It really wants to put all the classes MW and this is a hack to fix it
+		daysCount = np.sum(td[...,2:], axis=-2)
+		spreading = daysCount[...,0] + daysCount[...,2]
+
+		return softOverlapPenalty*self.SOFT_OVERLAP_WEIGHT + spreading*self.SPREADING_WEIGHT + \
+		       oddHoursPenalty*self.ODD_HOURS_WEIGHT + lunchHoursPenalty*self.LUNCH_HOURS_WEIGHT
+
+	def penalty_delta(self, i:int, new_t:int, new_d:np.array=None)->float:
+		'''Change in check_desirable() if course i were moved to start at new_t
+(and to days new_d, if given). Only the terms involving course i are recomputed:
+its odd hours and lunch terms, its soft constraint edges and its share of the spreading term.
+The schedule is not modified.
+'''
+		new = self.td[i].copy()
+		new[0], new[1] = new_t, new_t + self.length[i]
+		if new_d is not None:
+			new[2:] = new_d
+		return self.course_penalty(i, new) - self.course_penalty(i, self.td[i])
+
+	def course_penalty(self, i:int, td:np.array)->float:
+		'''The part of check_desirable() which depends on course i, if it were placed at td.'''
+		if _jit is not None:
+			return _jit.course_penalty(i, np.asarray(td, dtype=np.int64), self.td, self.soft_nbr_ptr,
+			                           self.soft_nbr_idx, self.soft_nbr_weight, *self.jit_args())
+		oddHoursPenalty   = td[0] in self.ODD_HOURS_INDICES or td[1] in self.ODD_HOURS_INDICES
+		lunchHoursPenalty = td[0] == self.LUNCH_HOUR_1_0 or td[0] == self.LUNCH_HOUR_1_5
+		edges = slice(self.soft_nbr_ptr[i], self.soft_nbr_ptr[i+1])
+		softOverlapPenalty = Course.td_conflicts(td, self.td[self.soft_nbr_idx[edges]]) @ self.soft_nbr_weight[edges]
+		spreading = td[2] + td[4]
+
+		return softOverlapPenalty*self.SOFT_OVERLAP_WEIGHT + spreading*self.SPREADING_WEIGHT + \
+		       oddHoursPenalty*self.ODD_HOURS_WEIGHT + lunchHoursPenalty*self.LUNCH_HOURS_WEIGHT
+
+	def hard_conflicts(self, i:int)->int:
+		'''Count the hard (cantOverlap) constraints involving course i which are violated.'''
+		edges = slice(self.hard_nbr_ptr[i], self.hard_nbr_ptr[i+1])
+		return int(Course.td_conflicts(self.td[i], self.td[self.hard_nbr_idx[edges]]) @ self.hard_nbr_weight[edges])
+
+	def move(self, i:int, new_t:int, new_d:np.array=None):
+		'''Move course i to start at new_t (and to days new_d, if given).
+The old placement is recorded in the journal so the move can be undone.
+'''
+		if self.journal_len == len(self.journal):
+			self.journal = np.vstack([self.journal, np.empty_like(self.journal)])
+		self.journal[self.journal_len,0]  = i
+		self.journal[self.journal_len,1:] = self.td[i]
+		self.journal_len += 1
+
+		self.td[i,0], self.td[i,1] = new_t, new_t + self.length[i]
+		if new_d is not None:
+			self.td[i,2:] = new_d
+		self.update_hash(i, self.journal[self.journal_len-1,1:])
+
+	def undo(self, mark:int=0):
+		'''Roll back the moves made since the journal had length mark
+(by default, every move since the last commit).'''
+		while self.journal_len > mark:
+			self.journal_len -= 1
+			i = self.journal[self.journal_len,0]
+			self.place(i, self.journal[self.journal_len,1:])
+
+	def commit(self):
+		'''Forget the journal, so the moves made so far can no longer be undone.'''
+		self.journal_len = 0
+
+	def neighbour_moves(self, i:int)->[(int, np.array)]:
+		'''List the (new_t, new_d) placements one step away from course i's:
+shift by one time index either way, or switch to another allowed day pattern.'''
+		moves = [(self.td[i,0] + t, None) for t in [-1, 1] if self.is_valid(i, t)]
+		patterns = Course.DAY_PATTERNS.get(np.sum(self.td[i,2:]), [])
+		moves += [(self.td[i,0], d) for d in patterns if np.any(d != self.td[i,2:])]
+		return moves
+
+	def local_search(self, max_sweeps:int=1)->float:
+		'''Hill-climb from the current schedule. In each sweep, every course takes its best
+improving neighbour move (see neighbour_moves) which doesn't add a hard constraint violation.
+Stops early when a sweep finds no improvement. Returns the total change in penalty.
+'''
+		total = 0.0
+		for sweep in range(max_sweeps):
+			improvement = 0.0
+			for i in range(len(self)):
+				moves = self.neighbour_moves(i)
+				deltas = [self.penalty_delta(i, new_t, new_d) for new_t, new_d in moves]
+				n_conflicts = self.hard_conflicts(i)
+
+				# Try the improving moves best first, rolling back any that break a hard constraint
+				for k in np.argsort(deltas, kind="stable"):
+					if deltas[k] >= 0:
+						break
+					mark = self.journal_len
+					self.move(i, *moves[k])
+					if self.hard_conflicts(i) <= n_conflicts:
+						improvement += deltas[k]
+						break
+					self.undo(mark)
+
+			self.commit()
+			total += improvement
+			if improvement == 0.0:
+				break
+		return total
+
+	def check_desirable_loop(self)->float:
+		'''Reference version of check_desirable which loops over courses and edges.
+Slow, kept to check the vectorized version against.'''
 		softOverlapPenalty = 0.0
 		oddHoursPenalty    = 0.0
 		lunchHoursPenalty  = 0.0
-		daysCount = np.zeros(5)
+		daysCount = np.sum(self.d, axis=0)
 
-		for course in self.schedule:
+		for i, td in enumerate(self.td):
 			# Check for odd (non-business) hours
-			if course.td[0] in self.ODD_HOURS_INDICES or course.td[1] in self.ODD_HOURS_INDICES:
+			if td[0] in self.ODD_HOURS_INDICES or td[1] in self.ODD_HOURS_INDICES:
 				oddHoursPenalty += 1
 			# Check for soft overlap constraint
-			for idx in course.shouldntOverlap:
-				if course.check_conflict(self.schedule[idx]):
+			for idx in self.soft_idx[self.soft_ptr[i]:self.soft_ptr[i+1]]:
+				# A course overlapping itself doesn't count
+				if idx != i and Course.td_conflict(td, self.td[idx]):
 					softOverlapPenalty += 1.0
 			# Penalize courses at lunchtime
-			if course.td[0] == self.LUNCH_HOUR_1_0 or course.td[0] == self.LUNCH_HOUR_1_5:
+			if td[0] == self.LUNCH_HOUR_1_0 or td[0] == self.LUNCH_HOUR_1_5:
 				lunchHoursPenalty += 1.0
 
-			daysCount += course.td[2:]
-
 
 		# It really wants to put all the classes MW and this is a hack to fix it
 		spreading = daysCount[0] + daysCount[2]
 		
-		# ADJUST THE PENALTY WEIGHTS HERE
-		return softOverlapPenalty*10.0 + spreading*1.0+ oddHoursPenalty*2.0 + lunchHoursPenalty*1.0
+		return softOverlapPenalty*self.SOFT_OVERLAP_WEIGHT + spreading*self.SPREADING_WEIGHT + \
+		       oddHoursPenalty*self.ODD_HOURS_WEIGHT + lunchHoursPenalty*self.LUNCH_HOURS_WEIGHT
 
 
 	def get_all_time_vectors(self)->np.array:
-		result = np.empty(len(self.schedule))
-		for i, course in enumerate(self.schedule):
-			result[i:(i+1)] = course.td[0]
-		return result
+		return self.td[:,0].astype(float)
 
 
 	def add_all_time_vectors(self, v:np.array)->np.array:
-		result = np.empty(len(self.schedule))
-		for i, course in enumerate(self.schedule):
-			if course.is_valid(v[i]):
-				#it has to be an integer
-				course.perturb(0, int(v[i]))
-			else:
-				course.perturb(np.random.choice([-1,0,1]), 0)
+		'''Move each course i by v[i] time indices. Courses which can't be moved that far
+get a random day perturbation (with probability 2/3) instead.'''
+		v = np.asarray(v)
+		valid = self.is_valid(slice(None), v)
+		#it has to be an integer
+		moved = np.flatnonzero(valid)
+		old = self.td[moved].copy()
+		self.td[moved,0:2] += v[moved,None].astype(int)
+		self.update_hash(moved, old)
+
+		invalid = np.flatnonzero(~valid)
+		self.randomize_days(invalid[self.rng.choice([-1,0,1], len(invalid)) != 0])
 
-			result[i:i+1] = course.td[0]
-		return result
+		return self.get_all_time_vectors()
 
 
 # TEST CODE
@@ -353,24 +954,48 @@ if __name__ == "__main__":
 	print("Generate a sample (random) schedule from data:")
 	infilename = "data/spring_csv_data.csv"# input("Data file name: ")
 
-	random_schedule = []
-
-	with open(infilename, "r") as infile:
-		# Use builtin csv reader
-		reader = csv.DictReader(infile)
-		for row in reader:
-			# Exclude TBA classes because they have no timing information
-			random_schedule.append( \
-			Course.init_random(float(row['meetingLengthHours']), 
-				               int(row['numberOfMeetings']),
-				               row['courseNumber'],
-				               int(row['numberEnrolled']),
-				               row['cantOverlap'],
-				               row['shouldntOverlap']))
-	
-	ucsp = Ucsp(random_schedule)
+	ucsp = Ucsp.init_random(coursedata.load(infilename))
+	random_schedule = ucsp.schedule
 	print("Random schedule is feasible?", ucsp.check_feasible())
+	print("Hard constraint violations:", np.sum(ucsp.count_violations()))
+	print("Repaired schedule is feasible?", ucsp.repair())
 	print("Random schedule is good? Penalty:", ucsp.check_desirable())
+	print("Vectorized penalty matches loop?", ucsp.check_desirable() == ucsp.check_desirable_loop())
+
+	# Move courses around every way there is, then check the incremental hash
+	ucsp.cache = PenaltyCache()
+	for k in range(100):
+		i = ucsp.rng.integers(len(ucsp))
+		ucsp.course(i).perturb(1, ucsp.rng.choice([-1, 1]), ucsp.rng)
+		ucsp.perturb(i, 1, 1)
+		for new_t, new_d in ucsp.neighbour_moves(i)[:1]:
+			ucsp.move(i, new_t, new_d)
+		ucsp.add_all_time_vectors(ucsp.rng.integers(-1, 2, len(ucsp)))
+		ucsp.check_desirable()
+	ucsp.undo()
+	ucsp.check_desirable()
+	zhash = ucsp.zhash
+	ucsp.rehash()
+	print("Incremental hash matches full rehash?", zhash == ucsp.zhash)
+	print("Penalty cache: {} hits, {} misses".format(ucsp.cache.hits, ucsp.cache.misses))
+
+	# A swarm of copies of one template (as main.init_samples makes them): 3 hour courses are
+	# placed in 1 hour slots in some samples and 1.5 hour slots in others, and moves have to
+	# keep each sample's own lengths and start ranges
+	data = coursedata.load(infilename)
+	rng = np.random.default_rng(0)
+	samples = [ucsp.copy(Ucsp.random_placements(data, sample_rng), sample_rng) for sample_rng in rng.spawn(10)]
+	lengths = [sample.td[:,1] - sample.td[:,0] for sample in samples]
+	kinds = {tuple(sample.td[:,0] < Course.N_HOUR_SLOTS) for sample in samples}
+	for sample in samples:
+		for k in range(10):
+			sample.add_all_time_vectors(sample.rng.integers(-2, 3, len(sample)))
+		sample.local_search(max_sweeps=2)
+	print("Samples with different slot kinds:", len(kinds))
+	print("Moves keep every sample's lengths and start ranges?",
+	      all(np.all(sample.td[:,1] - sample.td[:,0] == length) and
+	          np.all((sample.t_min <= sample.td[:,0]) & (sample.td[:,0] <= sample.t_max))
+	          for sample, length in zip(samples, lengths)))
 	for course in random_schedule:
 		print(course.courseName, course)
 
@@ -0,0 +1,105 @@
+# File created: 10/18/2026
+# Tested on   : Python 3.11, numba 0.68
+# Author(s)   : Emiko Soroka,
+# Unittests   : None
+# Description : Optional numba-compiled kernels for ucsp.Ucsp.
+# The penalty, delta penalty and hard constraint checks written as plain loops
+# over the columnar schedule arrays. Used by ucsp when the backend is "numba"
+# (see ucsp.set_backend). Without numba these still run, as slow Python.
+# How to use  : Run file for a parity test against the NumPy implementation.
+
+import numpy as np
+
+try:
+	import numba
+	jit = numba.njit(cache=True)
+	HAVE_NUMBA = True
+except ImportError:
+	jit = lambda f: f
+	HAVE_NUMBA = False
+
+
+@jit
+def td_conflict(td, other_td, time_table, day_table):
+	'''Same as ucsp.Course.td_conflict.'''
+	a = 0; b = 0
+	for k in range(5):
+		a |= td[2+k] << k
+		b |= other_td[2+k] << k
+	return time_table[td[0], td[1], other_td[0], other_td[1]] and day_table[a, b]
+
+
+@jit
+def weighted_conflicts(td, src, dst, edge_weight, time_table, day_table):
+	'''Sum edge_weight[e] over the edges (src[e], dst[e]) whose courses conflict.'''
+	n_conflicts = 0
+	for e in range(len(src)):
+		if td_conflict(td[src[e]], td[dst[e]], time_table, day_table):
+			n_conflicts += edge_weight[e]
+	return n_conflicts
+
+
+@jit
+def penalty(td, soft_src, soft_dst, soft_weight, odd, lunch, weights, time_table, day_table):
+	'''Same as ucsp.Ucsp.check_desirable for one (N, 7) schedule.
+odd and lunch are boolean masks over the 18 time indices,
+weights are the soft overlap, spreading, odd hours and lunch weights.'''
+	oddHoursPenalty = 0; lunchHoursPenalty = 0; spreading = 0
+	for i in range(td.shape[0]):
+		if odd[td[i,0]] or odd[td[i,1]]:
+			oddHoursPenalty += 1
+		if lunch[td[i,0]]:
+			lunchHoursPenalty += 1
+		spreading += td[i,2] + td[i,4]
+	softOverlapPenalty = weighted_conflicts(td, soft_src, soft_dst, soft_weight, time_table, day_table)
+
+	return softOverlapPenalty*weights[0] + spreading*weights[1] + \
+	       oddHoursPenalty*weights[2] + lunchHoursPenalty*weights[3]
+
+
+@jit
+def penalty_batch(td, soft_src, soft_dst, soft_weight, odd, lunch, weights, time_table, day_table):
+	'''penalty() for each schedule in a (P, N, 7) stack.'''
+	result = np.empty(td.shape[0])
+	for p in range(td.shape[0]):
+		result[p] = penalty(td[p], soft_src, soft_dst, soft_weight, odd, lunch, weights, time_table, day_table)
+	return result
+
+
+@jit
+def course_penalty(i, row, td, nbr_ptr, nbr_idx, nbr_weight, odd, lunch, weights, time_table, day_table):
+	'''Same as ucsp.Ucsp.course_penalty: the part of the penalty which depends on course i at row.'''
+	softOverlapPenalty = 0
+	for k in range(nbr_ptr[i], nbr_ptr[i+1]):
+		if td_conflict(row, td[nbr_idx[k]], time_table, day_table):
+			softOverlapPenalty += nbr_weight[k]
+	oddHoursPenalty   = 1 if odd[row[0]] or odd[row[1]] else 0
+	lunchHoursPenalty = 1 if lunch[row[0]] else 0
+	spreading = row[2] + row[4]
+
+	return softOverlapPenalty*weights[0] + spreading*weights[1] + \
+	       oddHoursPenalty*weights[2] + lunchHoursPenalty*weights[3]
+
+
+# TEST CODE
+
+if __name__ == "__main__":
+	import coursedata
+	import ucsp
+
+	print("numba installed?", HAVE_NUMBA)
+	print("Parity test: numba backend vs NumPy backend vs loop reference")
+	for infilename in ["data/spring_csv_data.csv", "data/Engineering_spring_2020.csv"]:
+		data = coursedata.load(infilename)
+
+		n_mismatch = 0
+		for k in range(20):
+			schedule = ucsp.Ucsp.init_random(data)
+			moves = [(i, new_t, new_d) for i in range(0, len(schedule), 7) for new_t, new_d in schedule.neighbour_moves(i)]
+			results = []
+			for backend in ["numpy", "numba"]:
+				ucsp.set_backend(backend)
+				results.append((schedule.check_desirable(), schedule.hard_violations(),
+				                [schedule.penalty_delta(i, new_t, new_d) for i, new_t, new_d in moves]))
+			n_mismatch += results[0] != results[1] or results[0][0] != schedule.check_desirable_loop()
+		print(infilename, "mismatches:", n_mismatch)